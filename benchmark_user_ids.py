@@ -0,0 +1,91 @@
+"""
+Compares random (UUIDv4) and time-ordered (UUIDv7) user IDs, stored as text and as native uuid.
+
+For every combination a scratch copy of the users table is filled with `--rows` users in
+batches of `--batch` rows, on the database configured by the DATABASE* environment variables.
+It reports the insert throughput over the whole run and over its last tenth (when the primary
+key is largest; at least the last batch), and the size of the table and of its primary key index. The scratch tables
+are dropped afterwards.
+
+The cost of random keys grows once the primary key no longer fits in `shared_buffers`, so
+choose `--rows` large enough for that to happen to see it.
+
+    python benchmark_user_ids.py --rows 2000000
+"""
+import argparse
+import time
+import uuid
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.configs import database_url
+from src.services.ids import uuid7
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+COLUMN_TYPES = ("text", "uuid")
+
+def run(connection, column_type: str, generator: str, rows: int, batch: int) -> dict:
+    table = f"bench_users_{column_type}_{generator}"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(
+            f"CREATE TABLE {table} (id {column_type} PRIMARY KEY, fullname TEXT, age INTEGER, "
+            "email TEXT, location TEXT)"
+        )
+    connection.commit()
+
+    new_id = GENERATORS[generator]
+    offsets = range(0, rows, batch)
+    # The first batch of the last tenth, or the last batch if the last tenth is shorter.
+    tail_start = next((offset for offset in offsets if offset >= rows - rows // 10), offsets[-1])
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            for offset in offsets:
+                if offset == tail_start:
+                    tail_started = time.perf_counter()
+                values = [
+                    (str(new_id()), f"User {n}", 18 + n % 60, f"user{n}@example.com", f"City {n % 500}")
+                    for n in range(offset, min(offset + batch, rows))
+                ]
+                execute_values(cursor, f"INSERT INTO {table} VALUES %s", values, page_size=batch)
+                connection.commit()
+            finished = time.perf_counter()
+
+            cursor.execute("SELECT pg_relation_size(%s), pg_relation_size(%s)", (table, f"{table}_pkey"))
+            table_size, index_size = cursor.fetchone()
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.commit()
+
+    return {
+        "rows_per_second": rows / (finished - started),
+        "tail_rows_per_second": (rows - tail_start) / (finished - tail_started),
+        "table_mb": table_size / 2**20,
+        "index_mb": index_size / 2**20,
+    }
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark user ID formats.")
+    parser.add_argument("--rows", type=positive_int, default=1_000_000, help="users inserted per combination")
+    parser.add_argument("--batch", type=positive_int, default=1000, help="users per INSERT and transaction")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(database_url())
+    try:
+        print(f"{'id':<12}{'column':<8}{'rows/s':>10}{'last 10% rows/s':>18}{'table MB':>10}{'pkey MB':>10}")
+        for column_type in COLUMN_TYPES:
+            for generator in GENERATORS:
+                result = run(connection, column_type, generator, args.rows, args.batch)
+                print(f"{generator:<12}{column_type:<8}{result['rows_per_second']:>10.0f}"
+                      f"{result['tail_rows_per_second']:>18.0f}{result['table_mb']:>10.1f}{result['index_mb']:>10.1f}")
+    finally:
+        connection.close()
@@ -1,5 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from src.configs import EMAIL_FILTER_ENABLED, EMAIL_FILTER_REBUILD_SECONDS, PROFILING_ENABLED
 from src.controllers import users_ct
-app = FastAPI()
+from src.logs import configure_logging, shutdown_logging
+from src.middlewares.profiling import ProfilingMiddleware
+from src.middlewares.request_context import RequestContextMiddleware
+from src.services.email_filter import rebuild_email_filter
 
-app.include_router(users_ct.router)
\ No newline at end of file
+async def rebuild_email_filter_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(rebuild_email_filter)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    configure_logging()
+
+    rebuilds = None
+    if EMAIL_FILTER_ENABLED:
+        await asyncio.to_thread(rebuild_email_filter)
+        if EMAIL_FILTER_REBUILD_SECONDS > 0:
+            rebuilds = asyncio.create_task(rebuild_email_filter_periodically(EMAIL_FILTER_REBUILD_SECONDS))
+
+    yield
+
+    if rebuilds is not None:
+        rebuilds.cancel()
+        with suppress(asyncio.CancelledError):
+            await rebuilds
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+app.include_router(users_ct.router)
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestContextMiddleware)
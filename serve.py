@@ -0,0 +1,177 @@
+"""
+Production entry point: runs `main:app` under gunicorn with uvicorn workers.
+
+    python serve.py
+
+The number of workers follows the CPUs available to the container (cgroup quota aware) and
+every worker gets an equal share of the database's connection budget, so that
+`workers x DATABASE_POOL_MAX` never exceeds `DATABASE_MAX_CONNECTIONS`, even while old and new
+workers overlap during a reload. The app is preloaded in the master process, and workers
+run on uvloop and httptools.
+
+Workers are recycled gracefully: each one is replaced after `MAX_REQUESTS` (+ jitter)
+requests, and `kill -HUP <master pid>` starts a new generation of workers before stopping
+the old one, which gets up to `GRACEFUL_TIMEOUT` seconds to finish in-flight requests. Because the app is
+preloaded, deploying new code needs a new master: `kill -USR2 <master pid>` starts it next
+to the old one, then `kill -WINCH` and `kill -QUIT` the old master once the new one is up.
+
+Environment Variables:
+    BIND (str): Address to listen on. Defaults to "0.0.0.0:8000".
+    WEB_CONCURRENCY (int): Overrides the CPU-based worker count.
+    DATABASE_MAX_CONNECTIONS (int): Connections this deployment may open. Defaults to 100.
+    DATABASE_RESERVED_CONNECTIONS (int): Connections kept free for admin tasks. Defaults to 10.
+    MAX_REQUESTS (int): Requests served by a worker before it is recycled. Defaults to 10000.
+    GRACEFUL_TIMEOUT (int): Seconds a worker may take to finish after a restart. Defaults to 30.
+    WORKER_TIMEOUT (int): Seconds a worker may go without a heartbeat, including while it
+        starts up (e.g. building the email filter), before it is killed. Defaults to 120.
+    MIGRATE_ON_STARTUP (bool): Apply pending migrations once, in the master, before any worker
+        starts. Defaults to false.
+
+The server refuses to start with more than one worker while `EMAIL_FILTER_ENABLED` is set:
+each worker's filter only sees its own writes, so the others would report existing emails as
+not taken.
+"""
+import math
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+class Worker(UvicornWorker):
+    """
+    A uvicorn worker pinned to the uvloop event loop and the httptools HTTP parser.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+def cgroup_cpu_limit() -> float | None:
+    """
+    Reads the CPU quota of the current cgroup.
+
+    Returns:
+        float | None: The number of CPUs allowed by the quota, or None if there is no quota.
+    """
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may use.
+
+    Takes the smaller of the CPU affinity mask and the cgroup quota, rounding a fractional
+    quota up.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+def worker_count() -> int:
+    """
+    Returns the number of workers: `WEB_CONCURRENCY` if set, otherwise one per available CPU.
+    """
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+def pool_size(workers: int) -> int:
+    """
+    Splits the database connection budget between workers.
+
+    The budget is divided by twice the worker count because a graceful reload briefly runs
+    the old and the new generation of workers side by side.
+
+    Args:
+        workers (int): The number of workers.
+
+    Returns:
+        int: The maximum pool size of each worker, at least 1.
+    """
+    budget = int(os.getenv("DATABASE_MAX_CONNECTIONS", "100"))
+    reserved = int(os.getenv("DATABASE_RESERVED_CONNECTIONS", "10"))
+    return max((budget - reserved) // (2 * workers), 1)
+
+class Server(BaseApplication):
+    """
+    A gunicorn application serving `main:app` with the given settings.
+
+    Args:
+        options (dict): gunicorn settings, e.g. `{"workers": 4}`.
+    """
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+def options() -> dict:
+    """
+    Builds the gunicorn settings from the environment.
+
+    Raises:
+        ValueError: If the email filter is enabled with more than one worker.
+    """
+    workers = worker_count()
+    # Read here rather than from src.configs, which must not be imported before the pool is sized.
+    email_filter = os.getenv("EMAIL_FILTER_ENABLED", "false").lower() in ("1", "true", "yes")
+    if email_filter and workers > 1:
+        raise ValueError(
+            f"EMAIL_FILTER_ENABLED requires a single worker, got {workers}; "
+            "set WEB_CONCURRENCY=1 or disable the filter"
+        )
+    return {
+        "bind": os.getenv("BIND", "0.0.0.0:8000"),
+        "workers": workers,
+        "worker_class": Worker,
+        "preload_app": True,
+        "max_requests": int(os.getenv("MAX_REQUESTS", "10000")),
+        "max_requests_jitter": int(os.getenv("MAX_REQUESTS_JITTER", "1000")),
+        "graceful_timeout": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "120")),
+        "keepalive": int(os.getenv("KEEPALIVE", "5")),
+    }
+
+if __name__ == "__main__":
+    try:
+        settings = options()
+    except ValueError as e:
+        raise SystemExit(str(e)) from None
+    # Set before the app is preloaded so src.configs reads it once, in the master.
+    os.environ.setdefault("DATABASE_POOL_MAX", str(pool_size(settings["workers"])))
+
+    from src.configs import MIGRATE_ON_STARTUP
+    if MIGRATE_ON_STARTUP:
+        from src.migrations.runner import configured_databases, migrate
+        for url in configured_databases():
+            migrate(url)
+
+    Server(settings).run()
@@ -2,15 +2,67 @@
  Provides a way to use operating system-dependent functionality like reading environment variables.
  """
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 import psycopg2
+import psycopg2.pool
 
-def database_connection():
-    """
-    Establishes and returns a connection to the PostgreSQL database.
+# Per-request profiling (see src/middlewares/profiling.py). Off unless PROFILING_ENABLED is set.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_SECRET = os.getenv("PROFILING_SECRET", "")
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))
+
+# Slow-query log (see src/repositories/query_log.py).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "60"))
+
+# Logging pipeline (see src/logs.py).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEDUP_WINDOW = float(os.getenv("LOG_DEDUP_WINDOW", "10"))
+
+# Connection pool, one per process. `serve.py` sizes DATABASE_POOL_MAX per worker.
+DATABASE_POOL_MIN = int(os.getenv("DATABASE_POOL_MIN", "1"))
+DATABASE_POOL_MAX = int(os.getenv("DATABASE_POOL_MAX", "5"))
+DATABASE_CONNECT_TIMEOUT = int(os.getenv("DATABASE_CONNECT_TIMEOUT", "3"))
+
+# Circuit breaker and last-known-good snapshots (see src/repositories/circuit_breaker.py).
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "10"))
+SNAPSHOT_MAX_ROWS = int(os.getenv("SNAPSHOT_MAX_ROWS", "10000"))
+
+# Users repository backend: "postgres", "sharded" or "memory" (see src/repositories/users_backend.py).
+USERS_BACKEND = os.getenv("USERS_BACKEND", "postgres").lower()
+
+# Sharded backend: comma-separated database URLs, in shard order (see src/repositories/users_sharded.py).
+DATABASE_SHARDS = [url.strip() for url in os.getenv("DATABASE_SHARDS", "").split(",") if url.strip()]
+
+# Fuzzy search: minimum word similarity (0 - 1) for a user to match.
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.5"))
+
+# Schema migrations (see src/migrations/runner.py), applied by serve.py before workers start.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# Email lookup Bloom filter (see src/services/email_filter.py). Opt-in: only safe when this
+# process makes every write to the users table, i.e. a single worker and no other writers.
+EMAIL_FILTER_ENABLED = os.getenv("EMAIL_FILTER_ENABLED", "false").lower() in ("1", "true", "yes")
+EMAIL_FILTER_CAPACITY = int(os.getenv("EMAIL_FILTER_CAPACITY", "1000000"))
+EMAIL_FILTER_ERROR_RATE = float(os.getenv("EMAIL_FILTER_ERROR_RATE", "0.01"))
+EMAIL_FILTER_REBUILD_SECONDS = float(os.getenv("EMAIL_FILTER_REBUILD_SECONDS", "0"))
+
+_pools: dict[str, psycopg2.pool.ThreadedConnectionPool] = {}
+_pools_pid: int | None = None
+_pool_lock = threading.Lock()
+_database = ContextVar("database", default=None)
 
-    This function retrieves database configuration details from environment variables,
-    connects to the database using `psycopg2`, and returns a cursor for executing SQL queries.
+def database_url() -> str:
+    """
+    Builds the PostgreSQL connection URL from environment variables.
 
     Environment Variables:
         DATABASE (str): Name of the PostgreSQL database.
@@ -19,20 +71,115 @@ def database_connection():
         DATABASE_HOST (str): Host address of the PostgreSQL server.
 
     Returns:
-        psycopg2.cursor: A cursor object for executing SQL queries.
-
-    Raises:
-        psycopg2.Error: If an error occurs during connection establishment.
+        str: The connection URL.
     """
-
     database = os.getenv("DATABASE")
     database_pwd = os.getenv("DATABASE_PWD")
     database_user = os.getenv("DATABASE_USER")
     database_host = os.getenv("DATABASE_HOST")
 
-    url = f"postgresql://{database_user}:{database_pwd}@{database_host}/{database}"
+    return f"postgresql://{database_user}:{database_pwd}@{database_host}/{database}"
+
+@contextmanager
+def use_database(url: str):
+    """
+    Makes `database_cursor` connect to another database for the duration of the block.
+
+    The setting is held in a context variable, so it applies to the current thread (or task)
+    only.
+
+    Args:
+        url (str): The database URL to use instead of `database_url()`.
+    """
+    token = _database.set(url)
+    try:
+        yield
+    finally:
+        _database.reset(token)
 
-    connection = psycopg2.connect(url)
-    cursor = connection.cursor()
+def database_pool(url: str | None = None) -> psycopg2.pool.ThreadedConnectionPool:
+    """
+    Returns the current process's connection pool for a database, creating it on first use.
+
+    Pools are created lazily, one per database URL, and re-created after a fork, so a
+    pre-forking server never shares connections between its workers.
+
+    Args:
+        url (str | None): The database URL. Defaults to the one selected by `use_database`,
+            or `database_url()`.
+
+    Returns:
+        psycopg2.pool.ThreadedConnectionPool: A pool of at most `DATABASE_POOL_MAX` connections.
+
+    Raises:
+        psycopg2.Error: If an error occurs during connection establishment.
+    """
+    global _pools_pid
+
+    url = url or _database.get() or database_url()
+    with _pool_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = psycopg2.pool.ThreadedConnectionPool(
+                DATABASE_POOL_MIN, DATABASE_POOL_MAX, url,
+                connect_timeout=DATABASE_CONNECT_TIMEOUT,
+            )
+        return pool
+
+def _rollback(connection) -> None:
+    if connection.closed:
+        return
+    try:
+        connection.rollback()
+    except psycopg2.Error:
+        connection.close()
+
+def _connection_failed(connection, error: psycopg2.Error) -> bool:
+    # Timeouts, deadlocks and the like are OperationalErrors too, but they carry a SQLSTATE
+    # outside class 08 (connection exception) and leave the connection usable.
+    return bool(connection.closed) or error.pgcode is None or error.pgcode.startswith("08")
+
+@contextmanager
+def database_cursor(url: str | None = None):
+    """
+    Borrows a pooled connection and yields a cursor for executing SQL queries.
+
+    The transaction is committed when the block completes and rolled back if it raises.
+    The connection is returned to the pool in both cases.
+
+    Args:
+        url (str | None): The database URL. Defaults to the one selected by `use_database`,
+            or `database_url()`.
+
+    Yields:
+        psycopg2.cursor: A cursor object for executing SQL queries.
+
+    Raises:
+        ConnectionError: If the database cannot be reached or the connection is lost.
+        psycopg2.Error: If a statement fails for any other reason, including statement
+            timeouts and deadlocks.
+    """
+    try:
+        pool = database_pool(url)
+        connection = pool.getconn()
+    except (psycopg2.OperationalError, psycopg2.pool.PoolError) as e:
+        raise ConnectionError(str(e).strip()) from e
 
-    return cursor
\ No newline at end of file
+    try:
+        with connection.cursor() as cursor:
+            yield cursor
+        connection.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        failed = _connection_failed(connection, e)
+        _rollback(connection)
+        if not failed:
+            raise
+        raise ConnectionError(str(e).strip()) from e
+    except BaseException:
+        _rollback(connection)
+        raise
+    finally:
+        pool.putconn(connection, close=bool(connection.closed))
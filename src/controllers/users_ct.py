@@ -1,7 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Query
+from fastapi import Response as HTTPResponse
+from src.dtos.encoders import JSON_MEDIA_TYPE, negotiate
 from src.dtos.response import Response
 from src.dtos.read.users import UsersRead
-from src.dtos.write.users import UsersWrite
+from src.dtos.write.users import UsersPatch, UsersWrite
+from src.services.users_ab import UsersServiceError
 from src.services.users_sv import UsersService
 
 router = APIRouter(tags=["user"])
@@ -46,6 +49,35 @@ async def update_user(userid: str, user: UsersWrite) -> Response[UsersRead]:
     """
     return UsersService.update_user(userid=userid, user=user)
 
+@router.patch("/user")
+async def patch_user(userid: str, user: UsersPatch) -> Response[UsersRead]:
+    """
+    Partially updates the information of an existing user by ID.
+
+    Only the fields present in the request body are updated.
+
+    Args:
+        userid (str): The ID of the user to be updated.
+        user (UsersPatch): An object containing the fields to update.
+
+    Returns:
+        Response[UsersRead]: A response containing the user's resulting information.
+    """
+    return UsersService.patch_user(userid=userid, user=user)
+
+@router.get("/user/by-email")
+async def get_user_by_email(email: str) -> Response[UsersRead]:
+    """
+    Retrieves user information by email.
+
+    Args:
+        email (str): The email of the user to be retrieved.
+
+    Returns:
+        Response[UsersRead]: A response containing the retrieved user's information.
+    """
+    return UsersService.get_user_by_email(email=email)
+
 @router.get("/user/{userid}")
 async def get_user_by_id(userid: str) -> Response[UsersRead]:
     """
@@ -60,11 +92,49 @@ async def get_user_by_id(userid: str) -> Response[UsersRead]:
     return UsersService.get_user_by_id(userid=userid)
 
 @router.get("/user")
-async def get_all_user() -> Response[UsersRead]:
+async def get_all_user(response: HTTPResponse, accept: str | None = Header(default=None)) -> Response[UsersRead]:
     """
     Retrieves information of all users.
 
+    The response format is negotiated from the `Accept` header: MessagePack
+    (`application/vnd.msgpack`) and Apache Arrow IPC (`application/vnd.apache.arrow.stream`)
+    are returned as binary bodies, anything else gets the JSON response envelope. Every
+    response carries `Vary: Accept`, so caches keep the formats apart. Binary bodies served
+    from last-known-good data during an outage carry `X-Stale: true`, the counterpart of the
+    envelope's `stale` field.
+
+    Args:
+        response (HTTPResponse): The outgoing response, used to set headers on the JSON envelope.
+        accept (str | None): The request's `Accept` header.
+
     Returns:
         Response[UsersRead]: A response containing information for all users.
     """
-    return UsersService.get_all_user()
\ No newline at end of file
+    response.headers["Vary"] = "Accept"
+    media_type = negotiate(accept)
+    if media_type != JSON_MEDIA_TYPE:
+        try:
+            body, stale = UsersService.get_all_user_encoded(media_type)
+        except UsersServiceError as e:
+            return e.response
+        headers = {"Vary": "Accept", "X-Stale": "true"} if stale else {"Vary": "Accept"}
+        return HTTPResponse(content=body, media_type=media_type, headers=headers)
+
+    return UsersService.get_all_user()
+
+@router.get("/users/search")
+async def search_users(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> Response[UsersRead]:
+    """
+    Fuzzy-searches users by fullname and location, e.g. "jon smit" finds "Jon Smith".
+
+    Args:
+        q (str): The search text.
+        limit (int): Maximum number of users to return.
+
+    Returns:
+        Response[UsersRead]: A response containing the matching users, best match first.
+    """
+    return UsersService.search_users(query=q, limit=limit)
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Binary encodings for bulk user listings and `Accept` header negotiation.
+
+Listings can be returned as MessagePack or as an Apache Arrow IPC stream instead of the JSON
+`Response` envelope. Both encoders work directly on the repository's row tuples
+`(id, fullname, age, email, location)`, without building `UsersRead` objects.
+
+`msgpack` and `pyarrow` are optional: a format whose library is not installed is never
+selected by `negotiate`, so clients fall back to JSON.
+"""
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/vnd.msgpack"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+USER_COLUMNS = ("id", "fullname", "age", "email", "location")
+
+_MEDIA_TYPE_ALIASES = {
+    "application/msgpack": MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE: MSGPACK_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE: ARROW_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE: JSON_MEDIA_TYPE,
+}
+
+def available_media_types() -> list[str]:
+    """
+    Returns the media types that can be produced with the installed libraries, JSON first.
+    """
+    media_types = [JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if pyarrow is not None:
+        media_types.append(ARROW_STREAM_MEDIA_TYPE)
+    return media_types
+
+def negotiate(accept: str | None) -> str:
+    """
+    Picks the response media type for an `Accept` header.
+
+    Media ranges are ranked by their `q` parameter; wildcards and unknown or unavailable
+    types resolve to JSON.
+
+    Args:
+        accept (str | None): The raw `Accept` header value.
+
+    Returns:
+        str: One of the media types returned by `available_media_types`.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    available = available_media_types()
+    candidates = []
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        resolved = _MEDIA_TYPE_ALIASES.get(media_type.lower())
+        if resolved in available and quality > 0:
+            candidates.append((-quality, position, resolved))
+
+    if not candidates:
+        return JSON_MEDIA_TYPE
+    return min(candidates)[2]
+
+def encode_msgpack(rows) -> bytes:
+    """
+    Encodes user rows as a MessagePack map of column names and row arrays.
+
+    Args:
+        rows: Repository tuples `(id, fullname, age, email, location)`.
+
+    Returns:
+        bytes: `{"columns": [...], "rows": [[...], ...]}` packed with MessagePack.
+    """
+    return msgpack.packb({"columns": USER_COLUMNS, "rows": rows}, use_bin_type=True)
+
+def encode_arrow(rows) -> bytes:
+    """
+    Encodes user rows as a single-batch Apache Arrow IPC stream.
+
+    Args:
+        rows: Repository tuples `(id, fullname, age, email, location)`.
+
+    Returns:
+        bytes: The IPC stream, readable with `pyarrow.ipc.open_stream`.
+    """
+    schema = pyarrow.schema([
+        ("id", pyarrow.string()),
+        ("fullname", pyarrow.string()),
+        ("age", pyarrow.int32()),
+        ("email", pyarrow.string()),
+        ("location", pyarrow.string()),
+    ])
+    columns = list(zip(*rows)) if rows else [()] * len(USER_COLUMNS)
+    batch = pyarrow.record_batch(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+ENCODERS = {
+    MSGPACK_MEDIA_TYPE: encode_msgpack,
+    ARROW_STREAM_MEDIA_TYPE: encode_arrow,
+}
@@ -3,4 +3,5 @@ from typing import List
 
 class Response[T](BaseModel):
     message: str
-    data: List[T]
\ No newline at end of file
+    data: List[T]
+    stale: bool = False
@@ -1,4 +1,10 @@
 from src.dtos.base.users import UsersBase
 
 class UsersWrite(UsersBase):
-    pass
\ No newline at end of file
+    pass
+
+class UsersPatch(UsersBase):
+    fullname: str | None = None
+    age: int | None = None
+    email: str | None = None
+    location: str | None = None
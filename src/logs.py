@@ -0,0 +1,229 @@
+"""
+Queue-backed, JSON-structured logging for the application.
+
+`configure_logging` is called once at application startup. It replaces the root logger's
+handlers with a `QueueHandler`, so `logging.error(...)` inside request handling only appends
+the record to an in-memory queue; a `QueueListener` thread formats the records as JSON and
+writes them to stderr. Records carry the current request ID, and request completion records
+carry the request latency.
+
+Repeated warnings and errors (same logger, level and message) are deduplicated for
+`LOG_DEDUP_WINDOW` seconds, and a summary record reports how many were suppressed when the
+window closes. When the queue is full, records are dropped instead of blocking the caller;
+once the queue has drained, the listener logs how many were dropped.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from src.configs import LOG_DEDUP_WINDOW, LOG_LEVEL, LOG_QUEUE_SIZE
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_listener: "DropReportingListener | None" = None
+_duplicate_filter: "DuplicateFilter | None" = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as single-line JSON objects.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for field in ("latency_ms", "method", "path", "status", "suppressed", "dropped"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """
+    Attaches the current request ID to every record.
+
+    Runs on the producer side, where the request's context variables are still available.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+class DuplicateFilter(logging.Filter):
+    """
+    Suppresses bursts of identical warnings and errors.
+
+    Records are identical when they share logger, level and formatted message; records below
+    `level` (such as access records) always pass. The first record of a burst passes and
+    repeats within `window` seconds are dropped. Once the window has closed, a summary record
+    carrying the number of suppressed repeats in its `suppressed` field is logged in their
+    place. Windows are checked as records arrive, and `flush` reports the open ones.
+
+    Args:
+        window (float): Number of seconds during which repeats are suppressed.
+        level (int): Records below this level are never suppressed.
+    """
+
+    def __init__(self, window: float, level: int = logging.WARNING):
+        super().__init__()
+        self.window = window
+        self.level = level
+        # (logger, level, message) -> [start of the window, suppressed repeats]
+        self._seen: dict[tuple, list] = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0 or record.levelno < self.level or hasattr(record, "suppressed"):
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            closed = self._close_windows(now) if now >= self._next_sweep else []
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                passed = False
+            else:
+                if seen is not None and seen[1]:
+                    closed.append((key, seen[1]))
+                self._seen[key] = [now, 0]
+                passed = True
+
+        self._report(closed)
+        return passed
+
+    def flush(self) -> None:
+        """
+        Reports the repeats suppressed in all open windows and forgets them.
+        """
+        with self._lock:
+            closed = [(key, seen[1]) for key, seen in self._seen.items() if seen[1]]
+            self._seen.clear()
+        self._report(closed)
+
+    def _close_windows(self, now: float) -> list[tuple[tuple, int]]:
+        self._next_sweep = now + min(self.window, 1.0)
+        expired = [key for key, seen in self._seen.items() if now - seen[0] >= self.window]
+        return [(key, count) for key in expired if (count := self._seen.pop(key)[1])]
+
+    @staticmethod
+    def _report(closed: list[tuple[tuple, int]]) -> None:
+        # Summaries carry `suppressed`, so they pass this filter when they come back through it.
+        for (name, levelno, message), count in closed:
+            logging.getLogger(name).log(levelno, "%s (%s repeats suppressed)", message, count,
+                                        extra={"suppressed": count})
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    A `QueueHandler` that drops records instead of blocking when the queue is full, and
+    counts them in `dropped`.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+class DropReportingListener(logging.handlers.QueueListener):
+    """
+    A `QueueListener` that reports the records its `DroppingQueueHandler` dropped.
+
+    Whenever the queue has drained after records were dropped, a warning carrying the number
+    of records dropped since the last report in its `dropped` field is written through the
+    listener's handlers directly, so the report itself can't be dropped.
+
+    Args:
+        queue_handler (DroppingQueueHandler): The handler feeding the queue.
+        *handlers (logging.Handler): The handlers records are written to.
+    """
+
+    def __init__(self, queue_handler: DroppingQueueHandler, *handlers: logging.Handler):
+        super().__init__(queue_handler.queue, *handlers)
+        self.queue_handler = queue_handler
+        self._reported = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            self.report_dropped()
+
+    def report_dropped(self) -> None:
+        """
+        Logs the number of records dropped since the last report, if any.
+        """
+        dropped = self.queue_handler.dropped
+        if dropped == self._reported:
+            return
+        count, self._reported = dropped - self._reported, dropped
+        record = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                   "%s log records dropped, the log queue was full", (count,), None)
+        record.dropped = count
+        record.request_id = None
+        super().handle(record)
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Installs the queue-backed logging pipeline on the root logger.
+
+    Calling it again while the pipeline is running has no effect.
+
+    Args:
+        level (str): The root log level, e.g. "INFO" or "WARNING".
+    """
+    global _listener, _duplicate_filter
+
+    if _listener is not None:
+        return
+
+    _duplicate_filter = DuplicateFilter(LOG_DEDUP_WINDOW)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(_duplicate_filter)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = DropReportingListener(queue_handler, stream_handler)
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """
+    Flushes queued records and stops the background logging thread.
+    """
+    global _listener
+
+    if _listener is not None:
+        _duplicate_filter.flush()
+        _listener.stop()
+        _listener.report_dropped()
+        _listener = None
@@ -0,0 +1,179 @@
+"""
+ASGI middleware that profiles individual requests with `cProfile`.
+
+The middleware is only installed when `PROFILING_ENABLED` is set. A request is profiled
+when it is picked by `PROFILING_SAMPLE_RATE`, or when it carries the profiling header with
+the shared secret `PROFILING_SECRET` (`X-Profile: <secret>`); without a secret configured
+the header is ignored. Header-triggered requests may ask for the profile inline
+(`X-Profile: inline:<secret>`), in which case the endpoint's response is replaced by the
+profile text. Every other profiled request is answered normally and its profile is written
+to `PROFILING_DIR` as a `.prof` file that can be opened with `pstats`, `snakeviz` or similar
+tools. No more files are written once the directory holds `PROFILING_MAX_FILES` of them.
+
+Only one profiler can be active per process, so a request that would be profiled while
+another one is being profiled is served without profiling.
+
+The profile covers the event loop thread while the request is in flight, not the request
+alone: other requests' coroutines that run on the loop while the profiled one awaits show up
+in it, and work done in worker threads (`asyncio.to_thread`, the threadpool sync endpoints
+run in, the sharded repository's fan-out pool) does not. Profile under low concurrency for a
+clean picture of a single request.
+
+Requests that are not profiled only pay for a header lookup and a random draw.
+"""
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+
+from src.configs import (
+    PROFILING_DIR,
+    PROFILING_HEADER,
+    PROFILING_MAX_FILES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SECRET,
+)
+
+# Held while a request is profiled; cProfile allows one active profiler per process.
+_profiling = threading.Lock()
+
+class ProfilingMiddleware:
+    """
+    Profiles a single HTTP request and stores or returns the collected call stack timings.
+
+    Args:
+        app: The ASGI application to wrap.
+        header (str): Name of the request header that forces profiling.
+        secret (str): Value the header must carry; the header is ignored when empty.
+        sample_rate (float): Fraction of requests (0.0 - 1.0) profiled without the header.
+        output_dir (str): Directory where `.prof` files are written.
+        max_files (int): Number of `.prof` files in `output_dir` after which no more are written.
+        sort_by (str): `pstats` sort key used for the inline text report.
+        limit (int): Number of entries printed in the inline text report.
+    """
+
+    def __init__(
+        self,
+        app,
+        header: str = PROFILING_HEADER,
+        secret: str = PROFILING_SECRET,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        output_dir: str = PROFILING_DIR,
+        max_files: int = PROFILING_MAX_FILES,
+        sort_by: str = "cumulative",
+        limit: int = 50,
+    ):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.sort_by = sort_by
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._profiling_mode(scope)
+        if mode == "file" and self._files_full():
+            mode = None
+        if mode is None or not _profiling.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(mode, scope, receive, send)
+        finally:
+            _profiling.release()
+
+    async def _profile(self, mode: str, scope, receive, send) -> None:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+
+        if mode == "inline":
+            # The endpoint's own response is discarded; the profile is sent instead.
+            async def discard(message):
+                return None
+
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+            await self._send_inline(send, profiler, time.perf_counter() - started)
+            return
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._dump(scope, profiler, time.perf_counter() - started)
+
+    def _profiling_mode(self, scope) -> str | None:
+        """
+        Decides whether the request is profiled.
+
+        Returns:
+            str | None: "inline" to return the profile, "file" to write it to disk,
+            or None when the request should not be profiled.
+        """
+        if self.secret:
+            for name, value in scope.get("headers", ()):
+                if name == self.header:
+                    value = value.decode("latin-1").strip()
+                    mode = "inline" if value.lower().startswith("inline:") else "file"
+                    secret = value[len("inline:"):] if mode == "inline" else value
+                    if hmac.compare_digest(secret.encode("latin-1"), self.secret.encode("utf-8")):
+                        return mode
+                    break
+
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "file"
+        return None
+
+    def _files_full(self) -> bool:
+        try:
+            files = sum(1 for name in os.listdir(self.output_dir) if name.endswith(".prof"))
+        except OSError:
+            return False
+        return files >= self.max_files
+
+    def _report(self, profiler: cProfile.Profile, elapsed: float) -> bytes:
+        buffer = io.StringIO()
+        buffer.write(f"request time: {elapsed * 1000:.2f} ms\n\n")
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats(self.sort_by).print_stats(self.limit)
+        return buffer.getvalue().encode("utf-8")
+
+    async def _send_inline(self, send, profiler: cProfile.Profile, elapsed: float) -> None:
+        body = self._report(profiler, elapsed)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _dump(self, scope, profiler: cProfile.Profile, elapsed: float) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            route = scope.get("path", "").strip("/").replace("/", "_") or "root"
+            filename = f"{int(time.time())}-{scope.get('method', 'GET')}-{route}-{uuid.uuid4().hex[:8]}.prof"
+            path = os.path.join(self.output_dir, filename)
+            profiler.dump_stats(path)
+            logging.warning("profiled %s %s in %.2f ms: %s",
+                            scope.get("method"), scope.get("path"), elapsed * 1000, path)
+        except OSError as e:
+            logging.error("Failed to write request profile: %s", e)
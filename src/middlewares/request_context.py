@@ -0,0 +1,67 @@
+"""
+ASGI middleware that assigns a request ID to every request and logs its latency.
+
+The request ID is taken from the `X-Request-ID` header when the client sends one and
+generated otherwise. It is stored in `src.logs.request_id_var`, so every record logged while
+the request is handled carries it, and it is echoed back in the response headers.
+"""
+import logging
+import time
+import uuid
+
+from src.logs import request_id_var
+
+logger = logging.getLogger("access")
+
+class RequestContextMiddleware:
+    """
+    Sets the request ID context for logging and logs one completion record per request.
+
+    Args:
+        app: The ASGI application to wrap.
+        header (str): Name of the request/response header carrying the request ID.
+    """
+
+    def __init__(self, app, header: str = "X-Request-ID"):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (self.header, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            logger.info(
+                "%s %s %s",
+                scope.get("method"), scope.get("path"), status,
+                extra={
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status,
+                },
+            )
+            request_id_var.reset(token)
@@ -0,0 +1,279 @@
+"""
+Applies the versioned SQL migrations in `src/migrations/versions`.
+
+Migrations are files named `<version>_<name>.sql` and are applied in version order. Each one
+is recorded in the `schema_migrations` table and never applied twice. A migration runs in a
+single transaction unless its first line is `-- migrate: no-transaction`, which is required
+for statements such as `CREATE INDEX CONCURRENTLY`; such migrations run statement by
+statement in autocommit mode and should therefore be idempotent (`IF NOT EXISTS`).
+
+Concurrent runners (e.g. two deployments starting at once) are serialized with a Postgres
+advisory lock. A waiting runner polls for the lock instead of blocking on it: a blocked
+statement holds a snapshot, which the lock holder's `CREATE INDEX CONCURRENTLY` would wait
+for in turn. Migrations are a deployment step; run them once per database (`serve.py` does
+so in its master process before starting workers), never from each worker.
+
+`users.id` is created as `TEXT`. Converting it to a native `uuid` column is an opt-in step
+outside the versioned migrations (`convert_ids_to_uuid`), since it rewrites the table.
+
+Usage:
+    python -m src.migrations.runner              # apply pending migrations (to every shard if sharded)
+    python -m src.migrations.runner --status     # list applied and pending migrations
+    python -m src.migrations.runner --uuid-ids   # store users.id as a native uuid column
+"""
+import argparse
+import logging
+import os
+import re
+import time
+
+import psycopg2
+
+from src.configs import DATABASE_SHARDS, USERS_BACKEND, database_url
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "versions")
+NO_TRANSACTION = "-- migrate: no-transaction"
+LOCK_ID = 7_031_032
+LOCK_POLL_SECONDS = 1.0
+UUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CREATE_INDEX = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?([\w.\"]+)",
+    re.IGNORECASE,
+)
+
+class MigrationError(Exception):
+    """
+    Raised when a migration cannot be applied or leaves the schema in an invalid state.
+    """
+
+def load_migrations(directory: str = VERSIONS_DIR) -> list[tuple[int, str, str]]:
+    """
+    Reads the migration files of a directory.
+
+    Args:
+        directory (str): The directory containing the `.sql` files.
+
+    Returns:
+        list[tuple[int, str, str]]: `(version, name, sql)` tuples ordered by version.
+
+    Raises:
+        MigrationError: If two files share a version.
+    """
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name = int(match.group(1)), match.group(2)
+        if version in migrations:
+            raise MigrationError(f"duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), encoding="utf-8") as file:
+            migrations[version] = (version, name, file.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Splits a migration into statements on semicolons, ignoring comment lines.
+
+    Args:
+        sql (str): The migration source.
+
+    Returns:
+        list[str]: The non-empty statements.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def applied_versions(cursor) -> set[int]:
+    """
+    Returns the versions recorded in `schema_migrations`, creating the table if needed.
+    """
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+        "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    )
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def created_indexes(statements: list[str]) -> list[str]:
+    """
+    Returns the names of the indexes created by the given statements.
+    """
+    return [match.group(1) for statement in statements if (match := _CREATE_INDEX.match(statement))]
+
+def _invalid_indexes(cursor, names: list[str]) -> list[str]:
+    # Only the migration's own indexes: others may be invalid for unrelated reasons, or still
+    # being built concurrently by another session.
+    if not names:
+        return []
+    cursor.execute(
+        "SELECT name FROM unnest(%s::text[]) AS name "
+        "JOIN pg_index ON indexrelid = to_regclass(name) WHERE NOT indisvalid",
+        (names,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def _apply(connection, version: int, name: str, sql: str) -> None:
+    cursor = connection.cursor()
+    try:
+        if sql.lstrip().startswith(NO_TRANSACTION):
+            connection.autocommit = True
+            statements = split_statements(sql)
+            for statement in statements:
+                cursor.execute(statement)
+
+            # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would skip.
+            invalid = _invalid_indexes(cursor, created_indexes(statements))
+            if invalid:
+                raise MigrationError(
+                    f"migration {version}_{name} left invalid indexes {invalid}; "
+                    "drop them and run the migrations again"
+                )
+            cursor.execute(
+                "INSERT INTO schema_migrations(version, name) VALUES(%s, %s)", (version, name,)
+            )
+        else:
+            connection.autocommit = False
+            cursor.execute(sql)
+            cursor.execute(
+                "INSERT INTO schema_migrations(version, name) VALUES(%s, %s)", (version, name,)
+            )
+            connection.commit()
+    except psycopg2.Error as e:
+        if not connection.autocommit:
+            connection.rollback()
+        raise MigrationError(f"migration {version}_{name} failed: {e}") from e
+    finally:
+        connection.autocommit = True
+        cursor.close()
+
+def configured_databases() -> list[str | None]:
+    """
+    Returns the databases of the configured users backend: every shard if it is sharded,
+    otherwise the database of the DATABASE* environment variables (as None).
+    """
+    return list(DATABASE_SHARDS) if USERS_BACKEND == "sharded" else [None]
+
+def _lock(cursor, function: str = "pg_try_advisory_lock") -> None:
+    # Poll outside of any statement, so that waiting never holds a snapshot.
+    while True:
+        cursor.execute(f"SELECT {function}(%s)", (LOCK_ID,))
+        if cursor.fetchone()[0]:
+            return
+        time.sleep(LOCK_POLL_SECONDS)
+
+def migrate(url: str | None = None, directory: str = VERSIONS_DIR) -> list[int]:
+    """
+    Applies all pending migrations.
+
+    Args:
+        url (str | None): The database URL. Defaults to `configs.database_url()`.
+        directory (str): The directory containing the migrations.
+
+    Returns:
+        list[int]: The versions that were applied.
+
+    Raises:
+        MigrationError: If a migration fails.
+    """
+    connection = psycopg2.connect(url or database_url())
+    connection.autocommit = True
+    applied = []
+    try:
+        with connection.cursor() as cursor:
+            _lock(cursor)
+            done = applied_versions(cursor)
+
+        try:
+            for version, name, sql in load_migrations(directory):
+                if version in done:
+                    continue
+                logging.warning("Applying migration %04d_%s", version, name)
+                _apply(connection, version, name, sql)
+                applied.append(version)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_ID,))
+    finally:
+        connection.close()
+    return applied
+
+def status(url: str | None = None, directory: str = VERSIONS_DIR) -> list[tuple[int, str, bool]]:
+    """
+    Lists the known migrations and whether each one has been applied.
+
+    Returns:
+        list[tuple[int, str, bool]]: `(version, name, applied)` tuples ordered by version.
+    """
+    connection = psycopg2.connect(url or database_url())
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            done = applied_versions(cursor)
+    finally:
+        connection.close()
+    return [(version, name, version in done) for version, name, _ in load_migrations(directory)]
+
+def convert_ids_to_uuid(url: str | None = None) -> bool:
+    """
+    Changes the type of `users.id` from text to native `uuid`.
+
+    A uuid takes 16 bytes instead of 37 in the table and its indexes. Existing UUID IDs of any
+    version are kept as they are. The table is rewritten under an exclusive lock, so run this
+    during a maintenance window on large tables. The code-point index on the text ids
+    (`users_id_c_idx`) is dropped, also when the column already is a uuid.
+
+    Args:
+        url (str | None): The database URL. Defaults to `configs.database_url()`.
+
+    Returns:
+        bool: True if the column was converted, False if it already was a uuid.
+
+    Raises:
+        MigrationError: If some IDs are not UUIDs.
+    """
+    connection = psycopg2.connect(url or database_url())
+    try:
+        with connection, connection.cursor() as cursor:
+            _lock(cursor, "pg_try_advisory_xact_lock")
+            cursor.execute(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'id'"
+            )
+            converted = cursor.fetchone()[0] == "uuid"
+            if not converted:
+                cursor.execute("SELECT count(*) FROM users WHERE id !~ %s", (UUID_PATTERN,))
+                invalid = cursor.fetchone()[0]
+                if invalid:
+                    raise MigrationError(f"{invalid} user ID(s) are not UUIDs, users.id left as text")
+            # The primary key already orders uuids by code point, and the text index's
+            # collation would make the type change fail.
+            cursor.execute("DROP INDEX IF EXISTS users_id_c_idx")
+            if converted:
+                return False
+            cursor.execute("ALTER TABLE users ALTER COLUMN id TYPE uuid USING id::uuid")
+    finally:
+        connection.close()
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    parser.add_argument("--url", action="append",
+                        help="database URL, repeatable (default: the DATABASE* environment variables, "
+                             "or every DATABASE_SHARDS URL with USERS_BACKEND=sharded)")
+    parser.add_argument("--uuid-ids", action="store_true", help="convert users.id to a native uuid column")
+    args = parser.parse_args()
+
+    for url in args.url or configured_databases():
+        if args.uuid_ids:
+            print("users.id converted to uuid" if convert_ids_to_uuid(url) else "users.id already is a uuid")
+        elif args.status:
+            for version, name, done in status(url):
+                print(f"{version:04d} {name} {'applied' if done else 'pending'}")
+        else:
+            versions = migrate(url)
+            print(f"applied {len(versions)} migration(s)" + (f": {versions}" if versions else ""))
@@ -0,0 +1,8 @@
+-- Creates the users table.
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    fullname TEXT,
+    age INTEGER,
+    email TEXT,
+    location TEXT
+);
@@ -0,0 +1,5 @@
+-- migrate: no-transaction
+-- Indexes for the repository's lookups. Built concurrently so writes are not blocked;
+-- the primary key on id already covers lookups and ordering by id. No statement filters or
+-- orders by age or location (search uses the trigram indexes of 0004), so they get none.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_email_key ON users (email);
@@ -0,0 +1,2 @@
+-- Trigram matching for fuzzy user search.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- Trigram indexes behind UsersRepository.search_users (word_similarity / <% operator).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_fullname_trgm_idx ON users USING gin (fullname gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_location_trgm_idx ON users USING gin (location gin_trgm_ops);
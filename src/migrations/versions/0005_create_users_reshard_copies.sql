@@ -0,0 +1,5 @@
+-- Records the users the resharding copy wrote to this shard, so that only those copies are
+-- ever pruned (see src/repositories/users_sharded.py).
+CREATE TABLE IF NOT EXISTS users_reshard_copies (
+    id TEXT PRIMARY KEY
+);
@@ -0,0 +1,5 @@
+-- migrate: no-transaction
+-- Code-point ordered index behind the sharded listing (ShardRepository.get_all_user), which
+-- needs ids in the order the merge compares them; the primary key follows the database
+-- collation. The cast keeps the index valid on databases whose ids already are uuids.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_id_c_idx ON users ((id::text) COLLATE "C");
@@ -0,0 +1,296 @@
+"""
+Circuit breaker and last-known-good snapshots around a users repository.
+
+`GuardedRepository` wraps a repository class. Every call goes through a `CircuitBreaker`:
+after `BREAKER_FAILURE_THRESHOLD` consecutive `ConnectionError`s the circuit opens and calls
+fail immediately with `CircuitOpenError` instead of waiting for a connection timeout. After
+`BREAKER_RESET_SECONDS` a single half-open probe is let through; its success closes the
+circuit, its failure keeps it open for another period. Generator methods are judged by their
+iteration, not by the creation of the generator.
+
+Successful reads are kept as last-known-good snapshots, in an LRU bounded by the total number
+of rows it holds; a listing larger than that budget is not kept. When a read
+fails with a `ConnectionError`, including while the circuit is open, and a snapshot exists
+for the same call, `StaleDataError` is raised carrying that snapshot, so the service can
+answer with data marked as stale instead of an empty response. Writes drop the snapshots
+they may have made wrong.
+"""
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from src.configs import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, SNAPSHOT_MAX_ROWS
+from src.repositories.users_ab import UsersRepositoryAbstruct
+
+class CircuitOpenError(ConnectionError):
+    """
+    Raised instead of calling the repository while the circuit is open.
+    """
+
+class StaleDataError(ConnectionError):
+    """
+    Raised when a read failed but a last-known-good result is available.
+
+    Args:
+        data: The last-known-good result of the same call.
+        age (float): Seconds since the snapshot was taken.
+    """
+
+    def __init__(self, data, age: float):
+        super().__init__("serving last-known-good data")
+        self.data = data
+        self.age = age
+
+class CircuitBreaker:
+    """
+    A consecutive-failure circuit breaker with half-open probes.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open before a probe is allowed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Closes the circuit and forgets past failures.
+        """
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._opened_at = 0.0
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func` through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe in flight.
+        """
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except ConnectionError:
+            self._on_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._on_success()
+        return result
+
+    def iterate(self, func, *args, **kwargs):
+        """
+        Iterates over the generator `func` returns through the breaker.
+
+        The call only touches the database once iteration starts, so the outcome is recorded
+        when iteration fails or finishes rather than when the generator is created.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe in flight.
+        """
+        self._before_call()
+        try:
+            yield from func(*args, **kwargs)
+        except ConnectionError:
+            self._on_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._on_success()
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                logging.warning("Circuit half-open, probing the database")
+                return
+            raise CircuitOpenError("circuit open, database calls are suspended")
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.warning("Circuit closed, database reachable again")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def _on_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.error("Circuit opened after %s consecutive failures", self.failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def _release_probe(self) -> None:
+        # A probe that failed for a non-connection reason still reached the database.
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.failures = 0
+
+class SnapshotStore:
+    """
+    A thread-safe LRU of last-known-good read results, bounded by the rows it holds.
+
+    A list result counts as one row per item, any other result as one row. Results larger
+    than the whole store are not kept.
+
+    Args:
+        max_rows (int): Maximum number of rows kept over all snapshots.
+    """
+
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self.rows = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(value) -> int:
+        return max(len(value), 1) if isinstance(value, list) else 1
+
+    def put(self, key, value) -> None:
+        size = self._size(value)
+        with self._lock:
+            self._pop(key)
+            if size > self.max_rows:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self.rows += size
+            while self.rows > self.max_rows:
+                self._pop(next(iter(self._entries)))
+
+    def get(self, key):
+        """
+        Returns `(value, taken_at)` for a key, or None if there is no snapshot.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def discard_where(self, predicate) -> None:
+        """
+        Drops every snapshot for which `predicate(key, value)` is true.
+        """
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(key, value)]:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.rows = 0
+
+    def _pop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.rows -= self._size(entry[0])
+
+class GuardedRepository:
+    """
+    Wraps a repository class with a circuit breaker and last-known-good snapshots.
+
+    Methods are looked up on the wrapped class at call time, so patching the wrapped class
+    (e.g. in tests) still takes effect.
+
+    Args:
+        repository: The repository class to wrap.
+        breaker (CircuitBreaker): The breaker all calls go through.
+        snapshots (SnapshotStore): Where successful read results are kept.
+    """
+
+    READS = ("get_user_by_id", "get_user_by_email", "get_all_user", "search_users")
+    WRITES = ("add_user", "delete_user", "update_user", "patch_user")
+    ITERATORS = ("get_all_emails",)
+
+    def __init__(self, repository, breaker: CircuitBreaker, snapshots: SnapshotStore):
+        self.repository = repository
+        self.breaker = breaker
+        self.snapshots = snapshots
+
+    def __getattr__(self, name: str):
+        func = getattr(self.repository, name)
+        if not callable(func) or name.startswith("_"):
+            return func
+
+        def guarded(*args, **kwargs):
+            if name in self.ITERATORS:
+                return self.breaker.iterate(getattr(self.repository, name), *args, **kwargs)
+            if name not in self.READS:
+                result = self.breaker.call(getattr(self.repository, name), *args, **kwargs)
+                if name in self.WRITES:
+                    self._invalidate(self._arguments(name, args, kwargs).get("userid"))
+                return result
+
+            key = (name, tuple(self._arguments(name, args, kwargs).items()))
+            try:
+                result = self.breaker.call(getattr(self.repository, name), *args, **kwargs)
+            except ConnectionError:
+                snapshot = self.snapshots.get(key)
+                if snapshot is None:
+                    raise
+                value, taken_at = snapshot
+                raise StaleDataError(value, time.monotonic() - taken_at) from None
+            self.snapshots.put(key, result)
+            return result
+
+        return guarded
+
+    @staticmethod
+    def _arguments(name: str, args: tuple, kwargs: dict) -> dict:
+        # Bound against the abstract signature, so positional and keyword calls share a key.
+        return inspect.signature(getattr(UsersRepositoryAbstruct, name)).bind(*args, **kwargs).arguments
+
+    def _invalidate(self, userid) -> None:
+        """
+        Drops the snapshots a write to `userid` may have made wrong: the user's own lookups,
+        email lookups that found nothing (the email may exist now), the listing and all searches.
+        """
+        def affected(key, value) -> bool:
+            name, arguments = key
+            if name == "get_user_by_id":
+                return dict(arguments).get("userid") == userid
+            if name == "get_user_by_email":
+                return value is None or value[0] == userid
+            return True
+
+        self.snapshots.discard_where(affected)
+
+    def reset(self) -> None:
+        """
+        Closes the circuit and drops all snapshots.
+        """
+        self.breaker.reset()
+        self.snapshots.clear()
+
+def guard(repository) -> GuardedRepository:
+    """
+    Wraps a repository class with a breaker and snapshot store configured from the environment.
+    """
+    return GuardedRepository(
+        repository,
+        CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS),
+        SnapshotStore(SNAPSHOT_MAX_ROWS),
+    )
@@ -0,0 +1,120 @@
+"""
+In-process trigram inverted index for fuzzy search in non-Postgres repository backends.
+
+Text is split into trigrams the way Postgres' `pg_trgm` does it: lower-cased words of
+alphanumeric characters, each padded with two spaces in front and one behind. A search ranks
+documents by the fraction of the query's trigrams found in their best-matching field, which
+approximates `pg_trgm`'s `word_similarity`, and only scores documents that share at least one
+trigram with the query.
+"""
+import re
+import threading
+from collections import Counter, defaultdict
+
+from src.configs import SEARCH_SIMILARITY_THRESHOLD
+
+_WORD = re.compile(r"[^\W_]+")
+
+def trigrams(text: str | None) -> set[str]:
+    """
+    Returns the `pg_trgm`-style trigrams of a text.
+
+    Args:
+        text (str | None): The text to split.
+
+    Returns:
+        set[str]: The trigrams, empty for empty or missing text.
+    """
+    if not text:
+        return set()
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NgramIndex:
+    """
+    A thread-safe trigram inverted index over the text fields of documents.
+
+    Args:
+        fields (tuple[str, ...]): Names of the indexed fields.
+        threshold (float): Minimum score for a document to be returned.
+    """
+
+    def __init__(self, fields: tuple[str, ...], threshold: float = SEARCH_SIMILARITY_THRESHOLD):
+        self.fields = fields
+        self.threshold = threshold
+        self._postings: dict[str, set] = defaultdict(set)
+        self._documents: dict[object, dict[str, set[str]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, document: dict) -> None:
+        """
+        Indexes a document, replacing any earlier version with the same key.
+
+        Args:
+            key: The document's identifier.
+            document (dict): A mapping containing (at least) the indexed fields.
+        """
+        grams = {field: trigrams(document.get(field)) for field in self.fields}
+        with self._lock:
+            self._unindex(key)
+            self._documents[key] = grams
+            for field_grams in grams.values():
+                for gram in field_grams:
+                    self._postings[gram].add(key)
+
+    def remove(self, key) -> None:
+        """
+        Removes a document from the index; unknown keys are ignored.
+        """
+        with self._lock:
+            self._unindex(key)
+
+    def _unindex(self, key) -> None:
+        grams = self._documents.pop(key, None)
+        if grams is None:
+            return
+        for field_grams in grams.values():
+            for gram in field_grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(key)
+                    if not postings:
+                        del self._postings[gram]
+
+    def search(self, query: str, limit: int) -> list[tuple[object, float]]:
+        """
+        Finds the documents best matching a query.
+
+        Args:
+            query (str): The search text.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[tuple[object, float]]: `(key, score)` pairs, best first; ties by key.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        # A field can't share more trigrams with the query than the whole document does,
+        # so documents below the threshold on their total hit count are skipped unscored.
+        required = self.threshold * len(query_grams)
+        with self._lock:
+            hits = Counter()
+            for gram in query_grams:
+                hits.update(self._postings.get(gram, ()))
+
+            scored = []
+            for key, count in hits.items():
+                if count < required:
+                    continue
+                fields = self._documents[key]
+                score = max(len(query_grams & grams) for grams in fields.values()) / len(query_grams)
+                if score >= self.threshold:
+                    scored.append((key, score))
+
+        scored.sort(key=lambda item: (-item[1], str(item[0])))
+        return scored[:limit]
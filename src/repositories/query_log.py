@@ -0,0 +1,166 @@
+"""
+Timed statement execution for the repository layer.
+
+Every repository statement goes through `execute`, which measures it and, when it takes
+longer than `SLOW_QUERY_MS`, logs the statement together with the shape of its parameters
+(never their values) and the plan Postgres chose for it. Plans are captured with
+`EXPLAIN (ANALYZE, BUFFERS)` for reads and a plain `EXPLAIN` for writes, so capturing a plan
+never applies a write twice. psycopg2 sends parameters as literals, so the captured plan has
+its constants replaced by `?` before it is logged. Plan capture is rate-limited to one per
+`SLOW_QUERY_EXPLAIN_INTERVAL` seconds per process, so a burst of slow statements cannot turn
+the capture itself into extra load.
+"""
+import logging
+import re
+import threading
+import time
+
+import psycopg2
+
+from src.configs import SLOW_QUERY_EXPLAIN_INTERVAL, SLOW_QUERY_MS
+
+class ExplainRateLimiter:
+    """
+    Allows at most one plan capture per interval.
+
+    Args:
+        interval (float): Minimum number of seconds between two captures.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last = float("-inf")
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """
+        Returns True if a capture may run now, and starts a new interval if so.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
+
+explain_limiter = ExplainRateLimiter(SLOW_QUERY_EXPLAIN_INTERVAL)
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+# "Index Cond", "Filter", "Join Filter", "One-Time Filter", ... but not "Rows Removed by Filter".
+_CONDITION = re.compile(r"^\s*(?:[\w-]+ )?(?:Cond|Filter|Condition)$")
+# Type modifiers of casts, e.g. "::numeric(10,2)" or "::character varying(20)", are matched
+# first so their numbers are kept.
+_NUMBER = re.compile(
+    r"(::(?:\w+ varying|\w+)\(\d+(?:,\d+)?\))|(?<![\w.$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE
+)
+
+def parameter_shapes(params) -> list[str]:
+    """
+    Describes statement parameters by type (and length for sized values) without their values.
+
+    Args:
+        params: The parameters passed to `cursor.execute`.
+
+    Returns:
+        list[str]: One description per parameter, e.g. `["str(36)", "int", "NoneType"]`.
+    """
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = params.values()
+
+    shapes = []
+    for param in params:
+        name = type(param).__name__
+        if isinstance(param, (str, bytes, list, tuple)):
+            shapes.append(f"{name}({len(param)})")
+        else:
+            shapes.append(name)
+    return shapes
+
+def redact_plan(plan: str) -> str:
+    """
+    Replaces the constants of a query plan with `?`.
+
+    String literals are replaced everywhere. Numbers are only replaced in conditions and
+    filters, since elsewhere they are the plan's own estimates and timings, and never in the
+    type modifiers of casts.
+
+    Args:
+        plan (str): The plan as printed by EXPLAIN.
+
+    Returns:
+        str: The plan without parameter values, e.g. `Index Cond: (email = ?::text)`.
+    """
+    lines = []
+    for line in _QUOTED.sub("?", plan).splitlines():
+        label, separator, expression = line.partition(": ")
+        if separator and _CONDITION.match(label):
+            line = label + separator + _NUMBER.sub(lambda match: match.group(1) or "?", expression)
+        lines.append(line)
+    return "\n".join(lines)
+
+def explain(connection, query: str, params=None) -> str | None:
+    """
+    Captures the execution plan of a statement inside a savepoint.
+
+    The plan is read on a separate cursor so the caller's pending result stays intact, and a
+    failing EXPLAIN is rolled back to the savepoint, so it never aborts the caller's transaction.
+
+    Args:
+        connection: The connection the statement was executed on.
+        query (str): The SQL statement.
+        params: The statement parameters.
+
+    Returns:
+        str | None: The plan as text without parameter values, or None if it could not be captured.
+    """
+    is_read = query.lstrip().upper().startswith("SELECT")
+    options = "(ANALYZE, BUFFERS) " if is_read else ""
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        cursor.execute(f"EXPLAIN {options}{query}", params)
+        plan = redact_plan("\n".join(row[0] for row in cursor.fetchall()))
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except psycopg2.Error as e:
+        logging.error("Failed to capture query plan: %s", e)
+        try:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        except psycopg2.Error:
+            pass
+        return None
+    finally:
+        cursor.close()
+
+def execute(cursor, query: str, params=None, threshold_ms: float = SLOW_QUERY_MS) -> float:
+    """
+    Executes a statement on the cursor and logs it if it exceeds the slow threshold.
+
+    Args:
+        cursor: The cursor to execute the statement on.
+        query (str): The SQL statement.
+        params: The statement parameters.
+        threshold_ms (float): Duration in milliseconds above which the statement is logged.
+
+    Returns:
+        float: The statement's duration in milliseconds.
+    """
+    started = time.perf_counter()
+    cursor.execute(query, params)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if elapsed_ms >= threshold_ms:
+        plan = explain(cursor.connection, query, params) if explain_limiter.acquire() else None
+
+        logging.warning(
+            "Slow query (%.1f ms): %s params=%s%s",
+            elapsed_ms,
+            " ".join(query.split()),
+            parameter_shapes(params),
+            f"\n{plan}" if plan else "",
+        )
+
+    return elapsed_ms
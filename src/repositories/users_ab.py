@@ -1,6 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 from src.dtos.write.users import UsersWrite
 
+# Columns of the users table that can be written by update_user and patch_user.
+PATCHABLE_COLUMNS = ("fullname", "age", "email", "location")
+
+class EmailTakenError(ValueError):
+    """
+    Raised when a write would give a user an email that another user already has.
+    """
+
 class UsersRepositoryAbstruct(ABC):
     """
     An abstract base class for managing user data in a repository. This class defines 
@@ -16,11 +25,23 @@ class UsersRepositoryAbstruct(ABC):
         update_user(userid: str, user: UsersWrite):
             Updates the user information with the given ID. Must be implemented by a subclass.
 
+        patch_user(userid: str, fields: dict):
+            Updates only the given columns of the user with the given ID. Must be implemented by a subclass.
+
         get_user_by_id(userid: str) -> any:
             Retrieves user information for the specified ID. Must be implemented by a subclass.
 
+        get_user_by_email(email: str) -> any:
+            Retrieves user information for the specified email. Must be implemented by a subclass.
+
         get_all_user() -> any:
             Retrieves all user records. Must be implemented by a subclass.
+
+        get_all_emails() -> Iterator[str]:
+            Streams the email of every user. Must be implemented by a subclass.
+
+        search_users(query: str, limit: int) -> any:
+            Fuzzy-searches users by fullname and location. Must be implemented by a subclass.
     """
 
     @staticmethod
@@ -67,6 +88,21 @@ class UsersRepositoryAbstruct(ABC):
         """
         raise NotImplementedError()
     
+    @staticmethod
+    @abstractmethod
+    def patch_user(userid: str, fields: dict) -> None:
+        """
+        Updates only the given columns of the user with the given ID.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            fields (dict): A mapping of column names to their new values.
+
+        Raises:
+            NotImplementedError: This method must be overridden in a subclass.
+        """
+        raise NotImplementedError()
+    
     @staticmethod
     @abstractmethod
     def get_user_by_id(userid) -> any:
@@ -84,6 +120,23 @@ class UsersRepositoryAbstruct(ABC):
         """
         raise NotImplementedError()
     
+    @staticmethod
+    @abstractmethod
+    def get_user_by_email(email: str) -> any:
+        """
+        Retrieves the user information for the specified email.
+
+        Args:
+            email (str): The email of the user to retrieve.
+
+        Returns:
+            any: The retrieved user information. The return type can vary depending on the implementation.
+
+        Raises:
+            NotImplementedError: This method must be overridden in a subclass.
+        """
+        raise NotImplementedError()
+    
     @staticmethod
     @abstractmethod
     def get_all_user() -> any:
@@ -93,6 +146,38 @@ class UsersRepositoryAbstruct(ABC):
         Returns:
             any: A list or collection of all users. The return type can vary depending on the implementation.
 
+        Raises:
+            NotImplementedError: This method must be overridden in a subclass.
+        """
+        raise NotImplementedError()
+    
+    @staticmethod
+    @abstractmethod
+    def get_all_emails() -> Iterator[str]:
+        """
+        Streams the email of every user.
+
+        Returns:
+            Iterator[str]: The emails, in no particular order.
+
+        Raises:
+            NotImplementedError: This method must be overridden in a subclass.
+        """
+        raise NotImplementedError()
+    
+    @staticmethod
+    @abstractmethod
+    def search_users(query: str, limit: int) -> any:
+        """
+        Fuzzy-searches users by fullname and location.
+
+        Args:
+            query (str): The search text, e.g. a partial or misspelled name.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            any: The matching users, best match first. The return type can vary depending on the implementation.
+
         Raises:
             NotImplementedError: This method must be overridden in a subclass.
         """
@@ -0,0 +1,28 @@
+"""
+Selects the users repository implementation from the `USERS_BACKEND` setting.
+
+    postgres (default): `UsersRepository`, backed by PostgreSQL.
+    sharded: `ShardedUsersRepository`, spread over the `DATABASE_SHARDS` PostgreSQL databases.
+    memory: `UsersMemoryRepository`, an in-process store for development and tests.
+
+The selected repository is wrapped in a circuit breaker that also serves last-known-good
+reads during outages (see `circuit_breaker.GuardedRepository`). The sharded repository
+guards every shard separately instead, so one shard being down does not affect the others.
+"""
+from src.configs import DATABASE_SHARDS, USERS_BACKEND
+from src.repositories.circuit_breaker import guard
+
+if USERS_BACKEND == "memory":
+    from src.repositories.users_mem import UsersMemoryRepository as Backend
+elif USERS_BACKEND == "postgres":
+    from src.repositories.users_rp import UsersRepository as Backend
+elif USERS_BACKEND == "sharded":
+    if not DATABASE_SHARDS:
+        raise ValueError("USERS_BACKEND=sharded requires DATABASE_SHARDS")
+    from src.repositories.users_sharded import ShardedUsersRepository as Backend
+else:
+    raise ValueError(f"unknown USERS_BACKEND: {USERS_BACKEND}")
+
+UsersRepository = Backend if USERS_BACKEND == "sharded" else guard(Backend)
+
+__all__ = ["UsersRepository"]
@@ -0,0 +1,171 @@
+from threading import RLock
+from typing import Iterator
+from src.repositories.ngram_index import NgramIndex
+from src.repositories.users_ab import PATCHABLE_COLUMNS, EmailTakenError, UsersRepositoryAbstruct
+from src.dtos.write.users import UsersWrite
+
+class UsersMemoryRepository(UsersRepositoryAbstruct):
+    """
+    In-process implementation of the UsersRepositoryAbstruct, for development and tests
+    without a database. Users are kept in a dictionary keyed by ID, and fuzzy search is
+    served by a trigram inverted index over fullname and location.
+
+    Rows are returned as the same (id, fullname, age, email, location) tuples as the
+    PostgreSQL repository.
+    """
+
+    _users: dict[str, tuple] = {}
+    _emails: dict[str, str] = {}
+    _index = NgramIndex(fields=("fullname", "location"))
+    _lock = RLock()
+
+    @staticmethod
+    def _store(row: tuple) -> None:
+        previous = UsersMemoryRepository._users.get(row[0])
+        if previous is not None and previous[3] is not None:
+            UsersMemoryRepository._emails.pop(previous[3], None)
+        if row[3] is not None:
+            UsersMemoryRepository._emails[row[3]] = row[0]
+        UsersMemoryRepository._users[row[0]] = row
+        UsersMemoryRepository._index.add(row[0], {"fullname": row[1], "location": row[4]})
+
+    @staticmethod
+    def add_user(user: UsersWrite, userid: str) -> None:
+        """
+        Adds a new user with the provided user data and ID.
+
+        Args:
+            user (UsersWrite): An object containing the user's information to be added.
+            userid (str): The ID associated with the user to be added.
+
+        Raises:
+            ValueError: If the ID is already taken.
+            EmailTakenError: If the email is already taken.
+        """
+        with UsersMemoryRepository._lock:
+            if userid in UsersMemoryRepository._users:
+                raise ValueError(f"user {userid} already exists")
+            if user.email in UsersMemoryRepository._emails:
+                raise EmailTakenError("email already taken")
+            UsersMemoryRepository._store((userid, user.fullname, user.age, user.email, user.location))
+
+    @staticmethod
+    def delete_user(userid: str) -> None:
+        """
+        Deletes an existing user with the given ID.
+
+        Args:
+            userid (str): The ID associated with the user to be deleted.
+        """
+        with UsersMemoryRepository._lock:
+            row = UsersMemoryRepository._users.pop(userid, None)
+            if row is not None and row[3] is not None:
+                UsersMemoryRepository._emails.pop(row[3], None)
+            UsersMemoryRepository._index.remove(userid)
+
+    @staticmethod
+    def update_user(userid: str, user: UsersWrite) -> None:
+        """
+        Updates the user information for the given ID.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            user (UsersWrite): An object containing the user's updated information.
+        """
+        UsersMemoryRepository.patch_user(userid, user.model_dump(include=set(PATCHABLE_COLUMNS)))
+
+    @staticmethod
+    def patch_user(userid: str, fields: dict) -> None:
+        """
+        Updates only the given columns of the user with the given ID.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            fields (dict): A mapping of column names to their new values.
+
+        Raises:
+            ValueError: If `fields` contains a column that cannot be updated.
+            EmailTakenError: If the email is already taken.
+        """
+        unknown = set(fields) - set(PATCHABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"cannot update columns: {', '.join(sorted(unknown))}")
+
+        with UsersMemoryRepository._lock:
+            row = UsersMemoryRepository._users.get(userid)
+            if row is None or not fields:
+                return
+            if fields.get("email") not in (None, row[3]) and fields["email"] in UsersMemoryRepository._emails:
+                raise EmailTakenError("email already taken")
+            current = dict(zip(("id",) + PATCHABLE_COLUMNS, row)) | fields
+            UsersMemoryRepository._store(
+                (userid, current["fullname"], current["age"], current["email"], current["location"])
+            )
+
+    @staticmethod
+    def get_user_by_id(userid: str) -> any:
+        """
+        Retrieves the user information for the specified ID.
+
+        Args:
+            userid (str): The ID of the user to retrieve.
+
+        Returns:
+            any: A tuple (id, fullname, age, email, location) if found, otherwise None.
+        """
+        return UsersMemoryRepository._users.get(userid)
+
+    @staticmethod
+    def get_user_by_email(email: str) -> any:
+        """
+        Retrieves the user information for the specified email.
+
+        Args:
+            email (str): The email of the user to retrieve.
+
+        Returns:
+            any: A tuple (id, fullname, age, email, location) if found, otherwise None.
+        """
+        with UsersMemoryRepository._lock:
+            userid = UsersMemoryRepository._emails.get(email)
+            return UsersMemoryRepository._users.get(userid) if userid is not None else None
+
+    @staticmethod
+    def get_all_user() -> any:
+        """
+        Retrieves all user records.
+
+        Returns:
+            any: A list of tuples (id, fullname, age, email, location).
+        """
+        with UsersMemoryRepository._lock:
+            return list(UsersMemoryRepository._users.values())
+
+    @staticmethod
+    def get_all_emails() -> Iterator[str]:
+        """
+        Streams the email of every user.
+
+        Returns:
+            Iterator[str]: The emails of all users that have one.
+        """
+        with UsersMemoryRepository._lock:
+            return iter(list(UsersMemoryRepository._emails))
+
+    @staticmethod
+    def search_users(query: str, limit: int) -> any:
+        """
+        Fuzzy-searches users by fullname and location using the trigram index.
+
+        Args:
+            query (str): The search text, e.g. a partial or misspelled name.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            any: A list of tuples (id, fullname, age, email, location), best match first.
+        """
+        with UsersMemoryRepository._lock:
+            return [
+                UsersMemoryRepository._users[key]
+                for key, _ in UsersMemoryRepository._index.search(query, limit)
+            ]
@@ -1,12 +1,34 @@
-from src.repositories.users_ab import UsersRepositoryAbstruct
+from contextlib import contextmanager, suppress
+from typing import Iterator
+from psycopg2.errors import InvalidTextRepresentation, UniqueViolation
+from src.repositories.users_ab import PATCHABLE_COLUMNS, EmailTakenError, UsersRepositoryAbstruct
 from src.dtos.write.users import UsersWrite
-from src.configs import database_connection
+from src.configs import SEARCH_SIMILARITY_THRESHOLD, database_cursor
+from src.repositories.query_log import execute
+
+@contextmanager
+def unique_violations():
+    """
+    Turns unique constraint violations raised by a write into `ValueError`s.
+
+    Raises:
+        EmailTakenError: If the unique index on `email` was violated.
+        ValueError: If another unique constraint, e.g. the primary key, was violated.
+    """
+    try:
+        yield
+    except UniqueViolation as e:
+        if e.diag.constraint_name == "users_email_key":
+            raise EmailTakenError("email already taken") from e
+        raise ValueError(str(e).strip()) from e
 
 class UsersRepository(UsersRepositoryAbstruct):
     """
     Concrete implementation of the UsersRepositoryAbstruct for managing user data in the database.
     This class provides static methods to add, delete, update, and retrieve user information 
-    using raw SQL queries with a PostgreSQL database.
+    using raw SQL queries with a PostgreSQL database. Connections are borrowed from the
+    process's pool, and statements are executed through `query_log.execute`, which logs slow
+    statements together with their query plans.
 
     Methods:
         add_user(user: UsersWrite, userid: str):
@@ -17,12 +39,24 @@ class UsersRepository(UsersRepositoryAbstruct):
         
         update_user(userid: str, user: UsersWrite):
             Updates the user information for the given ID.
+
+        patch_user(userid: str, fields: dict):
+            Updates only the given columns of the user with the given ID.
         
         get_user_by_id(userid: str) -> any:
             Retrieves user information for the specified ID.
         
+        get_user_by_email(email: str) -> any:
+            Retrieves user information for the specified email.
+
         get_all_user() -> any:
             Retrieves all user records from the database.
+
+        get_all_emails() -> Iterator[str]:
+            Streams the email of every user in the database.
+
+        search_users(query: str, limit: int) -> any:
+            Fuzzy-searches users by fullname and location using trigram indexes.
     """
 
     @staticmethod
@@ -33,13 +67,14 @@ class UsersRepository(UsersRepositoryAbstruct):
         Args:
             user (UsersWrite): An object containing the user's information to be added.
             userid (str): The ID associated with the user to be added.
+
+        Raises:
+            EmailTakenError: If the email is already taken.
+            ValueError: If the ID is already taken.
         """
-        cursor = database_connection()
         query = "INSERT INTO users(id, fullname, age, email, location) VALUES(%s, %s, %s, %s, %s)"
-        cursor.execute(query, (userid, user.fullname, user.age, user.email, user.location,))
-
-        cursor.connection.commit()
-        cursor.close()
+        with unique_violations(), database_cursor() as cursor:
+            execute(cursor, query, (userid, user.fullname, user.age, user.email, user.location,))
 
     @staticmethod
     def delete_user(userid: str) -> None:
@@ -49,12 +84,9 @@ class UsersRepository(UsersRepositoryAbstruct):
         Args:
             userid (str): The ID associated with the user to be deleted.
         """
-        cursor = database_connection()
         query = "DELETE FROM users WHERE id = %s"
-        cursor.execute(query, (userid,))
-
-        cursor.connection.commit()
-        cursor.close()
+        with database_cursor() as cursor:
+            execute(cursor, query, (userid,))
 
     @staticmethod
     def update_user(userid: str, user: UsersWrite) -> None:
@@ -64,13 +96,40 @@ class UsersRepository(UsersRepositoryAbstruct):
         Args:
             userid (str): The ID of the user to be updated.
             user (UsersWrite): An object containing the user's updated information.
+
+        Raises:
+            EmailTakenError: If the email is already taken by another user.
         """
-        cursor = database_connection()
         query = "UPDATE users SET fullname=%s, age=%s, email=%s, location=%s WHERE id=%s"
+        with unique_violations(), database_cursor() as cursor:
+            execute(cursor, query, (user.fullname, user.age, user.email, user.location, userid,))
+
+    @staticmethod
+    def patch_user(userid: str, fields: dict) -> None:
+        """
+        Updates only the given columns of the user with the given ID in the database.
 
-        cursor.execute(query, (user.fullname, user.age, user.email, user.location, userid,))
-        cursor.connection.commit()
-        cursor.close()
+        Does nothing when `fields` is empty.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            fields (dict): A mapping of column names to their new values.
+
+        Raises:
+            ValueError: If `fields` contains a column that cannot be updated.
+            EmailTakenError: If the email is already taken by another user.
+        """
+        unknown = set(fields) - set(PATCHABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"cannot update columns: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+
+        columns = [column for column in PATCHABLE_COLUMNS if column in fields]
+        assignments = ", ".join(f"{column}=%s" for column in columns)
+        query = f"UPDATE users SET {assignments} WHERE id=%s"
+        with unique_violations(), database_cursor() as cursor:
+            execute(cursor, query, (*(fields[column] for column in columns), userid,))
 
     @staticmethod
     def get_user_by_id(userid: str) -> any:
@@ -84,13 +143,28 @@ class UsersRepository(UsersRepositoryAbstruct):
             any: A tuple containing the user's information (id, fullname, age, email, location) 
             if found, otherwise None.
         """
-        cursor = database_connection()
         query = "SELECT id, fullname, age, email, location FROM users WHERE id = %s"
-        cursor.execute(query, (userid,))
-        response = cursor.fetchone()
+        # With a native uuid `id` column, an ID that isn't a UUID can't exist.
+        with suppress(InvalidTextRepresentation), database_cursor() as cursor:
+            execute(cursor, query, (userid,))
+            return cursor.fetchone()
+
+    @staticmethod
+    def get_user_by_email(email: str) -> any:
+        """
+        Retrieves the user information for the specified email from the database.
 
-        cursor.close()
-        return response
+        Args:
+            email (str): The email of the user to retrieve.
+
+        Returns:
+            any: A tuple containing the user's information (id, fullname, age, email, location) 
+            if found, otherwise None.
+        """
+        query = "SELECT id, fullname, age, email, location FROM users WHERE email = %s"
+        with database_cursor() as cursor:
+            execute(cursor, query, (email,))
+            return cursor.fetchone()
 
     @staticmethod
     def get_all_user() -> any:
@@ -101,10 +175,55 @@ class UsersRepository(UsersRepositoryAbstruct):
             any: A list of tuples containing user information (id, fullname, age, email, location) 
             for each user in the database.
         """
-        cursor = database_connection()
         query = "SELECT id, fullname, age, email, location FROM users"
-        cursor.execute(query)
-        response = cursor.fetchall()
+        with database_cursor() as cursor:
+            execute(cursor, query)
+            return cursor.fetchall()
+
+    @staticmethod
+    def get_all_emails() -> Iterator[str]:
+        """
+        Streams the email of every user from the database.
+
+        Uses a server-side cursor, so the emails are fetched in batches instead of being
+        loaded into memory at once.
 
-        cursor.close()
-        return response
\ No newline at end of file
+        Returns:
+            Iterator[str]: The emails of all users that have one.
+        """
+        query = "SELECT email FROM users WHERE email IS NOT NULL"
+        with database_cursor() as cursor:
+            with cursor.connection.cursor(name="users_emails") as stream:
+                stream.itersize = 10_000
+                execute(stream, query)
+                for row in stream:
+                    yield row[0]
+
+    @staticmethod
+    def search_users(query: str, limit: int) -> any:
+        """
+        Fuzzy-searches users by fullname and location in the database.
+
+        Matches with `pg_trgm`'s word similarity operator at `SEARCH_SIMILARITY_THRESHOLD`,
+        which is served by the trigram indexes on both columns, and ranks by the better of the
+        two similarities.
+
+        Args:
+            query (str): The search text, e.g. a partial or misspelled name.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            any: A list of tuples containing user information (id, fullname, age, email, location),
+            best match first.
+        """
+        sql = (
+            "SELECT id, fullname, age, email, location FROM users "
+            "WHERE %s <%% fullname OR %s <%% location "
+            "ORDER BY GREATEST(word_similarity(%s, fullname), word_similarity(%s, location)) DESC, id "
+            "LIMIT %s"
+        )
+        with database_cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                           (str(SEARCH_SIMILARITY_THRESHOLD),))
+            execute(cursor, sql, (query, query, query, query, limit,))
+            return cursor.fetchall()
@@ -0,0 +1,578 @@
+"""
+Hash-sharded users storage across several PostgreSQL databases.
+
+Every user lives in exactly one shard, picked by a jump consistent hash of its ID over the
+`DATABASE_SHARDS` URLs. Each shard carries the regular schema (run the migrations against
+every shard) and gets its own connection pool.
+
+Calls keyed by user ID run the regular `UsersRepository` statements on the user's shard.
+Calls that are not keyed by ID are sent to all shards in parallel and their results merged:
+listings in ID order, search results by similarity. Every shard has its own circuit breaker
+and last-known-good snapshots (see `circuit_breaker`). The unique index on `users.email` only
+covers a single shard, so writes that set an email look it up on all shards first; two
+concurrent writes of the same email to different shards can still both succeed.
+
+Jump hashing only moves the users that must move when shards are appended to (or removed from
+the end of) the list. `reshard` moves them in the background, see its docstring for the
+procedure. Until its cleanup step has run, moved users exist on their old and their new
+shard, so fan-out reads only keep the rows a shard owns under the current shard list.
+
+From the command line, the same steps run in the foreground:
+
+    python -m src.repositories.users_sharded --source URL,URL --target URL,URL,URL [--cleanup]
+"""
+import argparse
+import hashlib
+import heapq
+import logging
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator
+
+from psycopg2.extras import execute_values
+
+from src.configs import DATABASE_SHARDS, SEARCH_SIMILARITY_THRESHOLD, database_cursor, use_database
+from src.dtos.write.users import UsersWrite
+from src.repositories.circuit_breaker import GuardedRepository, StaleDataError, guard
+from src.repositories.query_log import execute
+from src.repositories.users_ab import EmailTakenError, UsersRepositoryAbstruct
+from src.repositories.users_rp import UsersRepository
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Maps a 64-bit key to one of `buckets` buckets (Lamping and Veach's jump consistent hash).
+
+    Growing the number of buckets from n to n + 1 moves only about 1 / (n + 1) of the keys,
+    all of them to the new bucket.
+
+    Args:
+        key (int): An unsigned 64-bit key.
+        buckets (int): The number of buckets, at least 1.
+
+    Returns:
+        int: The bucket, between 0 and `buckets - 1`.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+def shard_for(userid: str, shards: list[str]) -> str:
+    """
+    Returns the URL of the shard that stores a user.
+
+    Args:
+        userid (str): The user's ID.
+        shards (list[str]): The shard URLs, in shard order.
+
+    Returns:
+        str: One of `shards`.
+    """
+    key = int.from_bytes(hashlib.blake2b(userid.encode("utf-8"), digest_size=8).digest(), "little")
+    return shards[jump_hash(key, len(shards))]
+
+_executor: ThreadPoolExecutor | None = None
+_executor_pid: int | None = None
+_executor_lock = threading.Lock()
+
+def fan_out(func, shards: list[str]) -> list:
+    """
+    Calls `func(url)` for every shard in parallel.
+
+    Args:
+        func: A function taking a shard URL.
+        shards (list[str]): The shard URLs.
+
+    Returns:
+        list: The results, in shard order.
+
+    Raises:
+        Exception: Any exception raised by one of the calls.
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        # Worker threads don't survive a fork, so each process gets its own executor.
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(thread_name_prefix="users-shard")
+            _executor_pid = os.getpid()
+        executor = _executor
+    return list(executor.map(func, shards))
+
+class ShardRepository:
+    """
+    The users of one shard: the repository statements run on the shard's database, and
+    fan-out reads only return the users the shard owns under the current shard list.
+
+    Search results carry their similarity as a sixth column, for merging.
+
+    Args:
+        url (str): The shard's database URL.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._order = None
+
+    def _owns(self, userid, shards: list[str]) -> bool:
+        return shard_for(str(userid), shards) == self.url
+
+    def add_user(self, user: UsersWrite, userid: str) -> None:
+        with use_database(self.url):
+            UsersRepository.add_user(user, userid)
+
+    def delete_user(self, userid: str) -> None:
+        with use_database(self.url):
+            UsersRepository.delete_user(userid)
+
+    def update_user(self, userid: str, user: UsersWrite) -> None:
+        with use_database(self.url):
+            UsersRepository.update_user(userid, user)
+
+    def patch_user(self, userid: str, fields: dict) -> None:
+        with use_database(self.url):
+            UsersRepository.patch_user(userid, fields)
+
+    def get_user_by_id(self, userid: str) -> any:
+        with use_database(self.url):
+            return UsersRepository.get_user_by_id(userid)
+
+    def get_user_by_email(self, email: str) -> any:
+        shards = ShardedUsersRepository.shards
+        with use_database(self.url):
+            row = UsersRepository.get_user_by_email(email)
+        return row if row is not None and self._owns(row[0], shards) else None
+
+    def _id_order(self, cursor) -> str:
+        # Listings are merged by comparing ids as strings, i.e. by code point. Text ids get that
+        # order from the "C" collation index (migration 0006); uuid order is byte order, which
+        # is the code-point order of their lowercase text, so the primary key serves it. The
+        # cast keeps the text order valid if the column is converted while this process runs.
+        if self._order is None:
+            cursor.execute(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'id'"
+            )
+            self._order = "id" if cursor.fetchone()[0] == "uuid" else 'id::text COLLATE "C"'
+        return self._order
+
+    def get_all_user(self) -> list[tuple]:
+        shards = ShardedUsersRepository.shards
+        with database_cursor(self.url) as cursor:
+            query = f"SELECT id, fullname, age, email, location FROM users ORDER BY {self._id_order(cursor)}"
+            execute(cursor, query)
+            return [row for row in cursor.fetchall() if self._owns(row[0], shards)]
+
+    def get_all_emails(self) -> Iterator[str]:
+        shards = ShardedUsersRepository.shards
+        with database_cursor(self.url) as cursor:
+            with cursor.connection.cursor(name="users_emails") as stream:
+                stream.itersize = 10_000
+                execute(stream, "SELECT id, email FROM users WHERE email IS NOT NULL")
+                for userid, email in stream:
+                    if self._owns(userid, shards):
+                        yield email
+
+    def search_users(self, query: str, limit: int) -> list[tuple]:
+        shards = ShardedUsersRepository.shards
+        sql = (
+            "SELECT id, fullname, age, email, location, "
+            "GREATEST(word_similarity(%s, fullname), word_similarity(%s, location)) AS score "
+            "FROM users WHERE %s <%% fullname OR %s <%% location "
+            "ORDER BY score DESC, id LIMIT %s"
+        )
+        with database_cursor(self.url) as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                           (str(SEARCH_SIMILARITY_THRESHOLD),))
+            fetch = limit
+            while True:
+                execute(cursor, sql, (query, query, query, query, fetch,))
+                rows = cursor.fetchall()
+                owned = [row for row in rows if self._owns(row[0], shards)]
+                # Copies of users moving away took some of the places; ask for that many more.
+                if len(owned) >= limit or len(rows) < fetch:
+                    return owned[:limit]
+                fetch += limit - len(owned)
+
+_shards: dict[str, GuardedRepository] = {}
+_shards_lock = threading.Lock()
+
+def shard(url: str) -> GuardedRepository:
+    """
+    Returns the repository of a shard, behind that shard's own circuit breaker and snapshots.
+
+    One shard being down therefore neither fails calls to the others fast nor has its
+    failures reset by their successes.
+
+    Args:
+        url (str): The shard's database URL.
+
+    Returns:
+        GuardedRepository: The guarded `ShardRepository`, created on first use.
+    """
+    with _shards_lock:
+        guarded = _shards.get(url)
+        if guarded is None:
+            guarded = _shards[url] = guard(ShardRepository(url))
+        return guarded
+
+def _read_all(name: str, *args) -> tuple[list, float | None]:
+    # Shards that are down answer from their own snapshot; the result is as stale as the oldest.
+    def read(url: str):
+        try:
+            return getattr(shard(url), name)(*args), None
+        except StaleDataError as e:
+            return e.data, e.age
+
+    results = fan_out(read, ShardedUsersRepository.shards)
+    ages = [age for _, age in results if age is not None]
+    return [data for data, _ in results], max(ages) if ages else None
+
+class ShardedUsersRepository(UsersRepositoryAbstruct):
+    """
+    Implementation of the UsersRepositoryAbstruct that spreads users over several PostgreSQL
+    databases by a hash of their ID.
+
+    Every shard is called through its own circuit breaker (see `shard`). A fan-out read that
+    a shard can only answer from its last-known-good snapshot raises `StaleDataError` with
+    the merged result, which is then stale as a whole.
+
+    Attributes:
+        shards (list[str]): The shard URLs, in shard order. Defaults to `DATABASE_SHARDS`.
+    """
+
+    shards: list[str] = DATABASE_SHARDS
+
+    @staticmethod
+    def reset() -> None:
+        """
+        Closes the circuit of every shard and drops all snapshots.
+        """
+        with _shards_lock:
+            guarded = list(_shards.values())
+        for repository in guarded:
+            repository.reset()
+
+    @staticmethod
+    def _check_email(email: str | None, userid: str) -> None:
+        if email is None:
+            return
+        # Stale answers are not good enough to enforce uniqueness; StaleDataError propagates.
+        row = ShardedUsersRepository.get_user_by_email(email)
+        if row is not None and row[0] != userid:
+            raise EmailTakenError("email already taken")
+
+    @staticmethod
+    def add_user(user: UsersWrite, userid: str) -> None:
+        """
+        Adds a new user to its shard.
+
+        Args:
+            user (UsersWrite): An object containing the user's information to be added.
+            userid (str): The ID associated with the user to be added.
+
+        Raises:
+            EmailTakenError: If the email is already taken on any shard.
+        """
+        ShardedUsersRepository._check_email(user.email, userid)
+        shard(shard_for(userid, ShardedUsersRepository.shards)).add_user(user, userid)
+
+    @staticmethod
+    def delete_user(userid: str) -> None:
+        """
+        Deletes an existing user from its shard.
+
+        Args:
+            userid (str): The ID associated with the user to be deleted.
+        """
+        shard(shard_for(userid, ShardedUsersRepository.shards)).delete_user(userid)
+
+    @staticmethod
+    def update_user(userid: str, user: UsersWrite) -> None:
+        """
+        Updates the user information for the given ID on its shard.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            user (UsersWrite): An object containing the user's updated information.
+
+        Raises:
+            EmailTakenError: If the email is already taken by another user on any shard.
+        """
+        ShardedUsersRepository._check_email(user.email, userid)
+        shard(shard_for(userid, ShardedUsersRepository.shards)).update_user(userid, user)
+
+    @staticmethod
+    def patch_user(userid: str, fields: dict) -> None:
+        """
+        Updates only the given columns of the user with the given ID on its shard.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            fields (dict): A mapping of column names to their new values.
+
+        Raises:
+            ValueError: If `fields` contains a column that cannot be updated.
+            EmailTakenError: If the email is already taken by another user on any shard.
+        """
+        ShardedUsersRepository._check_email(fields.get("email"), userid)
+        shard(shard_for(userid, ShardedUsersRepository.shards)).patch_user(userid, fields)
+
+    @staticmethod
+    def get_user_by_id(userid: str) -> any:
+        """
+        Retrieves the user information for the specified ID from its shard.
+
+        Args:
+            userid (str): The ID of the user to retrieve.
+
+        Returns:
+            any: A tuple (id, fullname, age, email, location) if found, otherwise None.
+        """
+        return shard(shard_for(userid, ShardedUsersRepository.shards)).get_user_by_id(userid)
+
+    @staticmethod
+    def get_user_by_email(email: str) -> any:
+        """
+        Looks the email up on all shards in parallel.
+
+        Args:
+            email (str): The email of the user to retrieve.
+
+        Returns:
+            any: A tuple (id, fullname, age, email, location) if found, otherwise None.
+
+        Raises:
+            StaleDataError: If a shard answered from its snapshot; carries the result.
+        """
+        rows, age = _read_all("get_user_by_email", email)
+        row = next((row for row in rows if row is not None), None)
+        if age is not None:
+            raise StaleDataError(row, age)
+        return row
+
+    @staticmethod
+    def get_all_user() -> any:
+        """
+        Retrieves all users from all shards in parallel, merged in ID order.
+
+        Returns:
+            any: A list of tuples (id, fullname, age, email, location), ordered by ID.
+
+        Raises:
+            StaleDataError: If a shard answered from its snapshot; carries the result.
+        """
+        listings, age = _read_all("get_all_user")
+        users = list(heapq.merge(*listings, key=lambda row: row[0]))
+        if age is not None:
+            raise StaleDataError(users, age)
+        return users
+
+    @staticmethod
+    def get_all_emails() -> Iterator[str]:
+        """
+        Streams the email of every user, one shard after the other.
+
+        Returns:
+            Iterator[str]: The emails of all users that have one.
+        """
+        for url in ShardedUsersRepository.shards:
+            yield from shard(url).repository.get_all_emails()
+
+    @staticmethod
+    def search_users(query: str, limit: int) -> any:
+        """
+        Fuzzy-searches users on all shards in parallel and merges the results by similarity.
+
+        Each shard returns its best `limit` matches among the users it owns, with their
+        similarity, so the merged result is the same as searching a single database.
+
+        Args:
+            query (str): The search text, e.g. a partial or misspelled name.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            any: A list of tuples (id, fullname, age, email, location), best match first.
+
+        Raises:
+            StaleDataError: If a shard answered from its snapshot; carries the result.
+        """
+        results, age = _read_all("search_users", query, limit)
+        merged = heapq.merge(*results, key=lambda row: (-row[5], row[0]))
+        users = [row[:5] for row in islice(merged, limit)]
+        if age is not None:
+            raise StaleDataError(users, age)
+        return users
+
+def _stream_rows(url: str, name: str, columns: str = "id, fullname, age, email, location",
+                 table: str = "users") -> Iterator[tuple]:
+    with database_cursor(url) as cursor:
+        with cursor.connection.cursor(name=name) as stream:
+            stream.itersize = 10_000
+            execute(stream, f"SELECT {columns} FROM {table}")
+            yield from stream
+
+def _upsert(url: str, rows: list[tuple]) -> None:
+    with database_cursor(url) as cursor:
+        execute_values(
+            cursor,
+            "INSERT INTO users(id, fullname, age, email, location) VALUES %s "
+            "ON CONFLICT (id) DO UPDATE SET fullname = EXCLUDED.fullname, age = EXCLUDED.age, "
+            "email = EXCLUDED.email, location = EXCLUDED.location",
+            rows,
+        )
+        execute_values(
+            cursor,
+            "INSERT INTO users_reshard_copies(id) VALUES %s ON CONFLICT (id) DO NOTHING",
+            [(str(row[0]),) for row in rows],
+        )
+
+def _delete(url: str, ids: list[str], table: str = "users") -> None:
+    with database_cursor(url) as cursor:
+        execute(cursor, f"DELETE FROM {table} WHERE id IN %s", (tuple(ids),))
+
+def _existing(url: str, ids: list[str]) -> set[str]:
+    with database_cursor(url) as cursor:
+        execute(cursor, "SELECT id FROM users WHERE id IN %s", (tuple(ids),))
+        return {row[0] for row in cursor.fetchall()}
+
+def copy_moving_users(source: list[str], target: list[str], batch_size: int = 1000) -> dict[str, int]:
+    """
+    Copies every user whose shard differs between two shard lists to its new shard.
+
+    Users are upserted, so the copy can be repeated; a repeat picks up writes made on the
+    source shards since the last one. Every copy is recorded in `users_reshard_copies` on its
+    new shard, and recorded copies whose user has since been deleted from its source shard are
+    removed again; users created on the new shards are never touched. The source shards are
+    left untouched.
+
+    Run it only while traffic is served from `source`: once `target` serves it, a repeat
+    would overwrite newer writes on the new shards with the old copies.
+
+    Args:
+        source (list[str]): The shard URLs currently serving traffic.
+        target (list[str]): The new shard URLs.
+        batch_size (int): Number of users written per statement.
+
+    Returns:
+        dict[str, int]: The number of users `copied` and of stale copies `removed`.
+    """
+    copied = removed = 0
+    for url in source:
+        batches = defaultdict(list)
+        for row in _stream_rows(url, "users_reshard_copy"):
+            destination = shard_for(row[0], target)
+            if destination == url:
+                continue
+            batches[destination].append(row)
+            if len(batches[destination]) >= batch_size:
+                _upsert(destination, batches.pop(destination))
+                copied += batch_size
+        for destination, rows in batches.items():
+            _upsert(destination, rows)
+            copied += len(rows)
+
+    for url in target:
+        # Only users this copy wrote here; drop those that are gone from their source shard.
+        by_home = defaultdict(list)
+        for (userid,) in _stream_rows(url, "users_reshard_prune", "id", "users_reshard_copies"):
+            home = shard_for(userid, source)
+            if home != url:
+                by_home[home].append(userid)
+        for home, ids in by_home.items():
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                gone = sorted(set(batch) - _existing(home, batch))
+                if gone:
+                    _delete(url, gone)
+                    _delete(url, gone, "users_reshard_copies")
+                    removed += len(gone)
+
+    return {"copied": copied, "removed": removed}
+
+def delete_moved_users(source: list[str], target: list[str], batch_size: int = 1000) -> int:
+    """
+    Deletes from the source shards every user that belongs to another shard in `target`, and
+    forgets the copies recorded by `copy_moving_users` on the target shards.
+
+    Only run this once traffic is served from `target`.
+
+    Args:
+        source (list[str]): The previous shard URLs.
+        target (list[str]): The shard URLs now serving traffic.
+        batch_size (int): Number of users deleted per statement.
+
+    Returns:
+        int: The number of users deleted.
+    """
+    deleted = 0
+    for url in source:
+        moved = [userid for (userid,) in _stream_rows(url, "users_reshard_cleanup", "id")
+                 if shard_for(userid, target) != url]
+        for start in range(0, len(moved), batch_size):
+            _delete(url, moved[start:start + batch_size])
+        deleted += len(moved)
+    for url in target:
+        with database_cursor(url) as cursor:
+            execute(cursor, "DELETE FROM users_reshard_copies")
+    return deleted
+
+def reshard(source: list[str], target: list[str], cleanup: bool = False,
+            batch_size: int = 1000) -> threading.Thread:
+    """
+    Moves users between shard lists in a background thread.
+
+    The procedure for changing `DATABASE_SHARDS` from `source` to `target`:
+
+    1. Migrate the new shards, then run `reshard(source, target)` while the application
+       keeps serving from `source`.
+    2. Stop writes, run `reshard(source, target)` again to catch up, switch
+       `DATABASE_SHARDS` to `target` and resume.
+    3. Run `reshard(source, target, cleanup=True)` to delete the moved users from their old
+       shards.
+
+    Args:
+        source (list[str]): The shard URLs users are currently stored on.
+        target (list[str]): The new shard URLs. Append shards to (or remove them from the end
+            of) the list, so that only the users that must move do.
+        cleanup (bool): Delete moved users from their old shards instead of copying.
+        batch_size (int): Number of users written per statement.
+
+    Returns:
+        threading.Thread: The started thread; join it to wait for completion.
+    """
+    def run():
+        try:
+            if cleanup:
+                deleted = delete_moved_users(source, target, batch_size)
+                logging.warning("Resharding cleanup deleted %s moved users", deleted)
+            else:
+                counts = copy_moving_users(source, target, batch_size)
+                logging.warning("Resharding copied %s users and removed %s stale copies",
+                                counts["copied"], counts["removed"])
+        except Exception:
+            logging.exception("Resharding failed")
+
+    thread = threading.Thread(target=run, name="users-reshard", daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users between shard lists.")
+    parser.add_argument("--source", required=True, help="comma-separated current shard URLs")
+    parser.add_argument("--target", required=True, help="comma-separated new shard URLs")
+    parser.add_argument("--cleanup", action="store_true", help="delete moved users from their old shards")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    source, target = args.source.split(","), args.target.split(",")
+    if args.cleanup:
+        print(f"deleted {delete_moved_users(source, target, args.batch_size)} moved user(s)")
+    else:
+        counts = copy_moving_users(source, target, args.batch_size)
+        print(f"copied {counts['copied']} user(s), removed {counts['removed']} stale copies")
@@ -0,0 +1,175 @@
+"""
+In-process counting Bloom filter over the emails in the users table.
+
+The filter answers "is this email definitely not taken?" without a database round trip.
+It is rebuilt from the repository at startup (and every `EMAIL_FILTER_REBUILD_SECONDS` if
+set), and `UsersService` keeps it current on add, update and delete. A counting filter is
+used so that deleted or changed emails can be removed again.
+
+A negative answer is only trusted while the filter is `ready`, which requires
+`EMAIL_FILTER_ENABLED`. Emails written by other processes (other workers, other services)
+are not in this process's filter until the next rebuild, and until then lookups of them
+wrongly answer "does not exist". The filter is therefore opt-in, and only safe when a single
+process makes every write to the users table. The unique index on `users.email` stays the
+source of truth for uniqueness either way.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Iterable
+
+from src.configs import EMAIL_FILTER_CAPACITY, EMAIL_FILTER_ERROR_RATE
+from src.repositories.users_backend import UsersRepository
+
+class CountingBloomFilter:
+    """
+    A Bloom filter with 8-bit saturating counters, supporting removal.
+
+    Args:
+        capacity (int): Expected number of items.
+        error_rate (float): Target false positive rate at `capacity` items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.counters = bytearray(self.size)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        """
+        Adds an item to the filter.
+        """
+        for position in self._positions(item):
+            if self.counters[position] < 255:
+                self.counters[position] += 1
+
+    def remove(self, item: str) -> None:
+        """
+        Removes an item previously added to the filter.
+
+        Saturated counters are left untouched, since their true count is unknown.
+        """
+        positions = self._positions(item)
+        if not all(self.counters[position] for position in positions):
+            return
+        for position in positions:
+            if 0 < self.counters[position] < 255:
+                self.counters[position] -= 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.counters[position] for position in self._positions(item))
+
+class EmailFilter:
+    """
+    Thread-safe wrapper that owns the current email Bloom filter and its rebuilds.
+
+    Args:
+        capacity (int): Number of emails the filter is sized for; the false positive rate
+            grows beyond it.
+        error_rate (float): Target false positive rate.
+    """
+
+    def __init__(self, capacity: int = EMAIL_FILTER_CAPACITY, error_rate: float = EMAIL_FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        # Placeholder until the first rebuild; it is not consulted while the filter is not ready.
+        self._filter = CountingBloomFilter(1, error_rate)
+        self._pending: CountingBloomFilter | None = None
+        self._lock = threading.Lock()
+
+    def might_contain(self, email: str) -> bool:
+        """
+        Returns False only if the email is definitely not in the users table.
+
+        Always returns True until the filter has been built.
+        """
+        if not self.ready:
+            return True
+        with self._lock:
+            return email in self._filter
+
+    def add(self, email: str | None) -> None:
+        """
+        Records a newly stored email.
+        """
+        if email is None:
+            return
+        with self._lock:
+            self._filter.add(email)
+            if self._pending is not None:
+                self._pending.add(email)
+
+    def remove(self, email: str | None) -> None:
+        """
+        Records that an email is no longer stored.
+
+        Removals during a rebuild are not applied to the filter being built; the email may
+        then stay a false positive until the next rebuild, but is never a false negative.
+        """
+        if email is None:
+            return
+        with self._lock:
+            self._filter.remove(email)
+
+    def rebuild(self, emails: Iterable[str | None]) -> int:
+        """
+        Builds a fresh filter from all stored emails and swaps it in.
+
+        Writes recorded while the rebuild runs are applied to both the current and the new
+        filter.
+
+        Args:
+            emails (Iterable[str | None]): Every email in the users table.
+
+        Returns:
+            int: The number of emails added to the new filter.
+        """
+        pending = CountingBloomFilter(self.capacity, self.error_rate)
+        with self._lock:
+            self._pending = pending
+
+        count = 0
+        try:
+            for email in emails:
+                if email is None:
+                    continue
+                with self._lock:
+                    pending.add(email)
+                count += 1
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            self._filter = pending
+            self._pending = None
+            self.ready = True
+        return count
+
+email_filter = EmailFilter()
+
+def rebuild_email_filter() -> None:
+    """
+    Rebuilds the process's email filter from the repository.
+
+    Failures are logged and leave the filter in its previous state, so lookups keep going to
+    the database.
+    """
+    started = time.perf_counter()
+    try:
+        count = email_filter.rebuild(UsersRepository.get_all_emails())
+        logging.info("Email filter rebuilt with %s emails in %.0f ms",
+                     count, (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        logging.error("Failed to rebuild the email filter: %s", e)
@@ -10,9 +10,22 @@ with specific services or business logic.
 from abc import ABC, abstractmethod
 
 from src.dtos.read.users import UsersRead
-from src.dtos.write.users import UsersWrite
+from src.dtos.write.users import UsersPatch, UsersWrite
 from src.dtos.response import Response
 
+class UsersServiceError(Exception):
+    """
+    Raised by service methods that do not return a `Response` when the users could not be
+    retrieved.
+
+    Args:
+        response (Response[UsersRead]): The error response to send instead.
+    """
+
+    def __init__(self, response: Response[UsersRead]):
+        super().__init__(response.message)
+        self.response = response
+
 class UsersAbstractService(ABC):
     """
     An abstract base class that defines the interface for user-related operations.
@@ -64,6 +77,21 @@ class UsersAbstractService(ABC):
         """
         raise NotImplementedError()
 
+    @staticmethod
+    @abstractmethod
+    def patch_user(userid: str, user: UsersPatch) -> Response[UsersRead]:
+        """
+        Partially updates an existing user's information by ID.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            user (UsersPatch): The fields to update; unset fields are left unchanged.
+
+        Returns:
+            Response[UsersRead]: A response object containing the user's resulting information.
+        """
+        raise NotImplementedError()
+
     @staticmethod
     @abstractmethod
     def get_user_by_id(userid: str) -> Response[UsersRead]:
@@ -78,6 +106,20 @@ class UsersAbstractService(ABC):
         """
         raise NotImplementedError()
 
+    @staticmethod
+    @abstractmethod
+    def get_user_by_email(email: str) -> Response[UsersRead]:
+        """
+        Retrieves a user's information by email.
+
+        Args:
+            email (str): The email of the user to be retrieved.
+
+        Returns:
+            Response[UsersRead]: A response object containing the user's information.
+        """
+        raise NotImplementedError()
+
     @staticmethod
     @abstractmethod
     def get_all_user() -> Response[UsersRead]:
@@ -87,4 +129,37 @@ class UsersAbstractService(ABC):
         Returns:
             Response[UsersRead]: A response object containing a list of all users.
         """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def search_users(query: str, limit: int) -> Response[UsersRead]:
+        """
+        Fuzzy-searches users by fullname and location.
+
+        Args:
+            query (str): The search text.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            Response[UsersRead]: A response object containing the matching users, best match first.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def get_all_user_encoded(media_type: str) -> tuple[bytes, bool]:
+        """
+        Retrieves all users encoded in a binary bulk format.
+
+        Args:
+            media_type (str): The media type to encode the users in.
+
+        Returns:
+            tuple[bytes, bool]: The encoded users and whether they are last-known-good data
+            served during an outage.
+
+        Raises:
+            UsersServiceError: If the users could not be retrieved; carries the error response.
+        """
         raise NotImplementedError()
\ No newline at end of file
@@ -1,17 +1,14 @@
-import uuid
 import logging
+from src.dtos.encoders import ENCODERS
 from src.dtos.response import Response
 from src.dtos.read.users import UsersRead
-from src.dtos.write.users import UsersWrite
-from src.repositories.users_rp import UsersRepository
-from src.services.users_ab import UsersAbstractService
-
-# Configuring the logging settings
-logging.basicConfig(
-    level=logging.WARNING,
-    format="%(asctime)s %(levelname)s %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+from src.dtos.write.users import UsersPatch, UsersWrite
+from src.repositories.circuit_breaker import StaleDataError
+from src.repositories.users_ab import EmailTakenError
+from src.repositories.users_backend import UsersRepository
+from src.services.email_filter import email_filter
+from src.services.ids import uuid7
+from src.services.users_ab import UsersAbstractService, UsersServiceError
 
 class UsersService(UsersAbstractService):
     """
@@ -33,8 +30,9 @@ class UsersService(UsersAbstractService):
             Response[UsersRead]: A response object containing the created user's information.
         """
         try:
-            _id = str(uuid.uuid4())
+            _id = str(uuid7())
             UsersRepository.add_user(user, _id)
+            email_filter.add(user.email)
 
             return Response[UsersRead](
                 message="user created", 
@@ -43,6 +41,11 @@ class UsersService(UsersAbstractService):
                     **user.model_dump()
                 )]
             )
+        except EmailTakenError:
+            return Response[UsersRead](
+                message="email already taken", 
+                data=[]
+            )
         except (ValueError, TypeError) as e:
             logging.error("Data error occurred: %s",e)
             return Response[UsersRead](
@@ -72,6 +75,7 @@ class UsersService(UsersAbstractService):
 
             if does_user_exists:
                 UsersRepository.delete_user(userid)
+                email_filter.remove(does_user_exists[3])
                 return Response[UsersRead](
                     message="user deleted", 
                     data=[UsersRead(
@@ -116,6 +120,9 @@ class UsersService(UsersAbstractService):
             does_user_exists = UsersRepository.get_user_by_id(userid=userid)
             if does_user_exists:
                 UsersRepository.update_user(userid=userid, user=user)
+                if user.email != does_user_exists[3]:
+                    email_filter.remove(does_user_exists[3])
+                    email_filter.add(user.email)
                 return Response[UsersRead](
                     message="user updated", 
                     data=[UsersRead(
@@ -128,6 +135,76 @@ class UsersService(UsersAbstractService):
                 message="user does not exist", 
                 data=[]
             )
+        except EmailTakenError:
+            return Response[UsersRead](
+                message="email already taken", 
+                data=[]
+            )
+        except (ValueError, TypeError) as e:
+            logging.error("Data error occurred: %s",e)
+            return Response[UsersRead](
+                message="an error occurred while processing user data", 
+                data=[]
+            )
+        except ConnectionError as e:
+            logging.error("Database connection error: %s",e)
+            return Response[UsersRead](
+                message="failed to connect to the database", 
+                data=[]
+            )
+
+    @staticmethod
+    def patch_user(userid: str, user: UsersPatch) -> Response[UsersRead]:
+        """
+        Partially updates an existing user's information by ID.
+
+        Only the fields set on `user` are considered, and of those only the ones that differ
+        from the stored values are written. No write is issued when nothing changed.
+
+        Args:
+            userid (str): The ID of the user to be updated.
+            user (UsersPatch): The fields to update.
+
+        Returns:
+            Response[UsersRead]: A response object containing the user's resulting information.
+        """
+        try:
+            does_user_exists = UsersRepository.get_user_by_id(userid=userid)
+            if does_user_exists:
+                current = {
+                    "fullname": does_user_exists[1],
+                    "age": does_user_exists[2],
+                    "email": does_user_exists[3],
+                    "location": does_user_exists[4],
+                }
+                changes = {
+                    field: value
+                    for field, value in user.model_dump(exclude_unset=True).items()
+                    if current[field] != value
+                }
+                if changes:
+                    UsersRepository.patch_user(userid=userid, fields=changes)
+                    if "email" in changes:
+                        email_filter.remove(current["email"])
+                        email_filter.add(changes["email"])
+
+                return Response[UsersRead](
+                    message="user updated" if changes else "user unchanged", 
+                    data=[UsersRead(
+                        id=userid,
+                        **(current | changes)
+                    )]
+                )
+            
+            return Response[UsersRead](
+                message="user does not exist", 
+                data=[]
+            )
+        except EmailTakenError:
+            return Response[UsersRead](
+                message="email already taken", 
+                data=[]
+            )
         except (ValueError, TypeError) as e:
             logging.error("Data error occurred: %s",e)
             return Response[UsersRead](
@@ -176,6 +253,83 @@ class UsersService(UsersAbstractService):
                 message="an error occurred while processing user data", 
                 data=[]
             )
+        except StaleDataError as e:
+            logging.error("Database unavailable, serving data from %.0f s ago", e.age)
+            return Response[UsersRead](
+                message="user found" if e.data else "user does not exist", 
+                data=[UsersRead(
+                    id=e.data[0],
+                    fullname=e.data[1],
+                    email=e.data[3],
+                    location=e.data[4],
+                    age=e.data[2]
+                )] if e.data else [],
+                stale=True
+            )
+        except ConnectionError as e:
+            logging.error("Database connection error: %s",e)
+            return Response[UsersRead](
+                message="failed to connect to the database", 
+                data=[]
+            )
+
+    @staticmethod
+    def get_user_by_email(email: str) -> Response[UsersRead]:
+        """
+        Retrieves a user's information by email.
+
+        When the email filter is enabled, emails the in-process Bloom filter has never seen
+        are answered without querying the database.
+
+        Args:
+            email (str): The email of the user to be retrieved.
+
+        Returns:
+            Response[UsersRead]: A response object containing the user's information.
+        """
+        try:
+            if not email_filter.might_contain(email):
+                return Response[UsersRead](
+                    message="user does not exist", 
+                    data=[]
+                )
+
+            response = UsersRepository.get_user_by_email(email=email)
+            if response:
+                return Response[UsersRead](
+                    message="user found", 
+                    data=[UsersRead(
+                        id=response[0],
+                        fullname=response[1],
+                        email=response[3],
+                        location=response[4],
+                        age=response[2]
+                    )]
+                )
+            
+            return Response[UsersRead](
+                message="user does not exist", 
+                data=[]
+            )
+        except (ValueError, TypeError) as e:
+            logging.error("Data error occurred: %s",e)
+            return Response[UsersRead](
+                message="an error occurred while processing user data", 
+                data=[]
+            )
+        except StaleDataError as e:
+            logging.error("Database unavailable, serving data from %.0f s ago", e.age)
+            return Response[UsersRead](
+                message="user found" if e.data else "user does not exist", 
+                data=[UsersRead(
+                    id=e.data[0],
+                    fullname=e.data[1],
+                    email=e.data[3],
+                    location=e.data[4],
+                    age=e.data[2]
+                )] if e.data else [],
+                stale=True
+            )
         except ConnectionError as e:
             logging.error("Database connection error: %s",e)
             return Response[UsersRead](
@@ -217,9 +371,120 @@ class UsersService(UsersAbstractService):
                 message="an error occurred while processing user data", 
                 data=[]
             )
+        except StaleDataError as e:
+            logging.error("Database unavailable, serving data from %.0f s ago", e.age)
+            return Response[UsersRead](
+                message="users found" if e.data else "no users found",
+                data=[
+                    UsersRead(
+                        id=user[0],
+                        fullname=user[1],
+                        email=user[3],
+                        location=user[4],
+                        age=user[2]
+                    ) for user in e.data or []
+                ],
+                stale=True
+            )
         except ConnectionError as e:
             logging.error("Database connection error: %s",e)
             return Response[UsersRead](
                 message="failed to connect to the database", 
                 data=[]
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def search_users(query: str, limit: int) -> Response[UsersRead]:
+        """
+        Fuzzy-searches users by fullname and location.
+
+        Args:
+            query (str): The search text, e.g. a partial or misspelled name.
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            Response[UsersRead]: A response object containing the matching users, best match first.
+        """
+        try:
+            response = UsersRepository.search_users(query=query, limit=limit)
+            if response:
+                users_list = [
+                    UsersRead(
+                        id=user[0],
+                        fullname=user[1],
+                        email=user[3],
+                        location=user[4],
+                        age=user[2]
+                    ) for user in response
+                ]
+                return Response[UsersRead](
+                    message="users found",
+                    data=users_list
+                )
+            return Response[UsersRead](
+                message="no users found", 
+                data=[]
+            )
+        except (ValueError, TypeError) as e:
+            logging.error("Data error occurred: %s",e)
+            return Response[UsersRead](
+                message="an error occurred while processing user data", 
+                data=[]
+            )
+        except StaleDataError as e:
+            logging.error("Database unavailable, serving data from %.0f s ago", e.age)
+            return Response[UsersRead](
+                message="users found" if e.data else "no users found",
+                data=[
+                    UsersRead(
+                        id=user[0],
+                        fullname=user[1],
+                        email=user[3],
+                        location=user[4],
+                        age=user[2]
+                    ) for user in e.data or []
+                ],
+                stale=True
+            )
+        except ConnectionError as e:
+            logging.error("Database connection error: %s",e)
+            return Response[UsersRead](
+                message="failed to connect to the database", 
+                data=[]
+            )
+
+    @staticmethod
+    def get_all_user_encoded(media_type: str) -> tuple[bytes, bool]:
+        """
+        Retrieves all users encoded in a binary bulk format.
+
+        The repository rows are encoded directly, without building `UsersRead` objects.
+
+        Args:
+            media_type (str): One of the binary media types in `encoders.ENCODERS`.
+
+        Returns:
+            tuple[bytes, bool]: The encoded users and whether they are last-known-good data
+            served during an outage.
+
+        Raises:
+            UsersServiceError: If the users could not be retrieved; carries the error response.
+        """
+        try:
+            response = UsersRepository.get_all_user()
+            return ENCODERS[media_type](response or []), False
+        except (ValueError, TypeError) as e:
+            logging.error("Data error occurred: %s",e)
+            raise UsersServiceError(Response[UsersRead](
+                message="an error occurred while processing user data", 
+                data=[]
+            )) from e
+        except StaleDataError as e:
+            logging.error("Database unavailable, serving data from %.0f s ago", e.age)
+            return ENCODERS[media_type](e.data or []), True
+        except ConnectionError as e:
+            logging.error("Database connection error: %s",e)
+            raise UsersServiceError(Response[UsersRead](
+                message="failed to connect to the database", 
+                data=[]
+            )) from e
\ No newline at end of file
@@ -0,0 +1,242 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import psycopg2.errors
+from src.configs import database_cursor
+from src.repositories.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedRepository,
+    SnapshotStore,
+    StaleDataError,
+)
+
+def failing():
+    raise ConnectionError("Connection error")
+
+class QueryCanceled(psycopg2.errors.QueryCanceled):
+    # psycopg2 only sets the SQLSTATE on errors reported by the server.
+    pgcode = "57014"
+
+class ConnectionFailure(psycopg2.OperationalError):
+    pgcode = "08006"
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test suite for the repository circuit breaker and its last-known-good snapshots.
+    """
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    def open_circuit(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(failing)
+
+    def test_opens_after_consecutive_failures(self):
+        """
+        Test that the circuit opens after the threshold and then fails fast.
+        """
+        func = MagicMock()
+
+        self.open_circuit()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(func)
+        func.assert_not_called()
+
+    def test_success_resets_failure_count(self):
+        """
+        Test that only consecutive failures count towards opening the circuit.
+        """
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(failing)
+        self.breaker.call(lambda: None)
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(failing)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('src.repositories.circuit_breaker.time.monotonic')
+    def test_half_open_probe_closes_circuit(self, mock_monotonic):
+        """
+        Test that a successful probe after the reset timeout closes the circuit.
+        """
+        mock_monotonic.return_value = 100
+        self.open_circuit()
+
+        mock_monotonic.return_value = 111
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('src.repositories.circuit_breaker.time.monotonic')
+    def test_failed_probe_reopens_circuit(self, mock_monotonic):
+        """
+        Test that a failed probe keeps the circuit open for another reset period.
+        """
+        mock_monotonic.return_value = 100
+        self.open_circuit()
+
+        mock_monotonic.return_value = 111
+        with self.assertRaises(ConnectionError):
+            self.breaker.call(failing)
+
+        mock_monotonic.return_value = 115
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: "ok")
+
+    @patch('src.repositories.circuit_breaker.time.monotonic')
+    def test_failed_email_stream_probe_keeps_circuit_open(self, mock_monotonic):
+        """
+        Test that a half-open probe through get_all_emails is judged by its iteration.
+        """
+        # Arrange
+        def get_all_emails():
+            raise ConnectionError("Connection error")
+            yield
+
+        repository = MagicMock()
+        repository.get_all_emails.side_effect = get_all_emails
+        guarded = GuardedRepository(repository, self.breaker, SnapshotStore(10))
+        mock_monotonic.return_value = 100
+        self.open_circuit()
+
+        # Act
+        mock_monotonic.return_value = 111
+        emails = guarded.get_all_emails()
+        state_before_iteration = self.breaker.state
+        with self.assertRaises(ConnectionError):
+            list(emails)
+
+        # Assert
+        self.assertEqual(state_before_iteration, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.failures, 3)
+
+    def test_guarded_repository_serves_snapshot(self):
+        """
+        Test that a failed read raises StaleDataError carrying the last successful result.
+        """
+        repository = MagicMock()
+        repository.search_users.side_effect = [[("id-1",)], ConnectionError("Connection error")]
+        guarded = GuardedRepository(repository, self.breaker, SnapshotStore(10))
+
+        guarded.search_users("jon", 20)
+        with self.assertRaises(StaleDataError) as error:
+            guarded.search_users(query="jon", limit=20)
+
+        self.assertEqual(error.exception.data, [("id-1",)])
+
+    def test_guarded_repository_keeps_listing_within_budget(self):
+        """
+        Test that the listing is served from its snapshot, unless it is larger than the store.
+        """
+        # Arrange
+        repository = MagicMock()
+        repository.get_all_user.side_effect = [
+            [("id-1",), ("id-2",)], ConnectionError("Connection error"),
+            [("id-1",), ("id-2",), ("id-3",)], ConnectionError("Connection error"),
+        ]
+        guarded = GuardedRepository(repository, self.breaker, SnapshotStore(2))
+
+        # Act
+        guarded.get_all_user()
+        with self.assertRaises(StaleDataError) as stale:
+            guarded.get_all_user()
+        guarded.get_all_user()
+        with self.assertRaises(ConnectionError) as error:
+            guarded.get_all_user()
+
+        # Assert
+        self.assertEqual(stale.exception.data, [("id-1",), ("id-2",)])
+        self.assertNotIsInstance(error.exception, StaleDataError)
+
+    def test_guarded_repository_drops_snapshot_after_write(self):
+        """
+        Test that writing a user drops its cached single-user read.
+        """
+        repository = MagicMock()
+        repository.get_user_by_id.side_effect = [("id-1",), ConnectionError("Connection error")]
+        guarded = GuardedRepository(repository, self.breaker, SnapshotStore(10))
+
+        guarded.get_user_by_id(userid="id-1")
+        guarded.delete_user("id-1")
+
+        with self.assertRaises(ConnectionError) as error:
+            guarded.get_user_by_id(userid="id-1")
+        self.assertNotIsInstance(error.exception, StaleDataError)
+
+    def test_write_drops_email_listing_and_search_snapshots(self):
+        """
+        Test that a write drops the user's email lookup, negative email lookups, the listing and searches.
+        """
+        # Arrange
+        repository = MagicMock()
+        repository.get_user_by_email.side_effect = lambda email: ("id-1",) if email == "a@example.com" else None
+        repository.search_users.return_value = [("id-2",)]
+        repository.get_all_user.return_value = [("id-2",)]
+        snapshots = SnapshotStore(10)
+        guarded = GuardedRepository(repository, self.breaker, snapshots)
+        guarded.get_user_by_email("a@example.com")
+        guarded.get_user_by_email("new@example.com")
+        guarded.get_user_by_id("id-3")
+        guarded.get_all_user()
+        guarded.search_users("jon", 20)
+
+        # Act
+        guarded.patch_user("id-1", {"email": "b@example.com"})
+
+        # Assert
+        self.assertEqual([key[0] for key in snapshots._entries], ["get_user_by_id"])
+
+    def test_snapshot_store_is_bounded_by_rows(self):
+        """
+        Test that the store evicts the least recently used snapshots to stay within its row budget.
+        """
+        snapshots = SnapshotStore(max_rows=5)
+
+        snapshots.put("a", [1, 2, 3])
+        snapshots.put("b", [4, 5])
+        snapshots.get("a")
+        snapshots.put("c", [6])
+        snapshots.put("d", list(range(6)))
+
+        self.assertIsNone(snapshots.get("b"))
+        self.assertIsNone(snapshots.get("d"))
+        self.assertEqual(snapshots.get("a")[0], [1, 2, 3])
+        self.assertEqual(snapshots.rows, 4)
+
+    @patch('src.configs.database_pool')
+    def test_statement_timeout_is_not_a_connection_failure(self, mock_pool):
+        """
+        Test that a canceled statement propagates as is and does not count towards opening the circuit.
+        """
+        # Arrange
+        mock_pool.return_value.getconn.return_value.closed = 0
+
+        def slow_query():
+            with database_cursor():
+                raise QueryCanceled("canceling statement due to statement timeout")
+
+        # Act
+        for _ in range(3):
+            with self.assertRaises(psycopg2.errors.QueryCanceled):
+                self.breaker.call(slow_query)
+
+        # Assert
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    @patch('src.configs.database_pool')
+    def test_lost_connection_is_a_connection_failure(self, mock_pool):
+        """
+        Test that connection exceptions (SQLSTATE class 08) are raised as ConnectionError.
+        """
+        mock_pool.return_value.getconn.return_value.closed = 0
+
+        with self.assertRaises(ConnectionError):
+            with database_cursor():
+                raise ConnectionFailure("connection failure")
+
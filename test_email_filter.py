@@ -0,0 +1,71 @@
+import unittest
+from src.services.email_filter import CountingBloomFilter, EmailFilter
+
+class TestEmailFilter(unittest.TestCase):
+    """
+    Test suite for the counting Bloom filter behind email lookups.
+    """
+
+    def test_added_items_are_always_found(self):
+        """
+        Test that the filter has no false negatives.
+        """
+        bloom = CountingBloomFilter(capacity=10_000, error_rate=0.01)
+        emails = [f"user{i}@example.com" for i in range(10_000)]
+
+        for email in emails:
+            bloom.add(email)
+
+        self.assertTrue(all(email in bloom for email in emails))
+
+    def test_false_positive_rate_is_bounded(self):
+        """
+        Test that the false positive rate at capacity stays close to the target.
+        """
+        bloom = CountingBloomFilter(capacity=10_000, error_rate=0.01)
+        for i in range(10_000):
+            bloom.add(f"user{i}@example.com")
+
+        false_positives = sum(f"other{i}@example.com" in bloom for i in range(10_000))
+
+        self.assertLess(false_positives, 200)
+
+    def test_removed_items_are_not_found(self):
+        """
+        Test that removing an item makes it a negative again without affecting others.
+        """
+        bloom = CountingBloomFilter(capacity=1_000, error_rate=0.01)
+        bloom.add("john@example.com")
+        bloom.add("jane@example.com")
+
+        bloom.remove("john@example.com")
+
+        self.assertNotIn("john@example.com", bloom)
+        self.assertIn("jane@example.com", bloom)
+
+    def test_filter_is_not_trusted_before_rebuild(self):
+        """
+        Test that every email might exist until the filter has been built.
+        """
+        email_filter = EmailFilter(capacity=1_000, error_rate=0.01)
+
+        self.assertTrue(email_filter.might_contain("john@example.com"))
+
+        email_filter.rebuild(["jane@example.com", None])
+
+        self.assertFalse(email_filter.might_contain("john@example.com"))
+        self.assertTrue(email_filter.might_contain("jane@example.com"))
+
+    def test_writes_during_rebuild_are_kept(self):
+        """
+        Test that emails added while a rebuild is streaming end up in the new filter.
+        """
+        email_filter = EmailFilter(capacity=1_000, error_rate=0.01)
+
+        def emails():
+            yield "jane@example.com"
+            email_filter.add("john@example.com")
+
+        email_filter.rebuild(emails())
+
+        self.assertTrue(email_filter.might_contain("john@example.com"))
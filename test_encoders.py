@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch
+import msgpack
+import pyarrow.ipc
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.controllers import users_ct
+from src.repositories.users_backend import UsersRepository
+from src.dtos.encoders import (
+    ARROW_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    encode_arrow,
+    encode_msgpack,
+    negotiate,
+)
+
+ROWS = [
+    ("id-1", "John Doe", 30, "john@example.com", "USA"),
+    ("id-2", "Jane Doe", None, "jane@example.com", None),
+]
+
+class TestEncoders(unittest.TestCase):
+    """
+    Test suite for the binary listing encoders and Accept negotiation.
+    """
+
+    def test_negotiate_defaults_to_json(self):
+        """
+        Test that missing, wildcard and unknown Accept headers resolve to JSON.
+        """
+        self.assertEqual(negotiate(None), JSON_MEDIA_TYPE)
+        self.assertEqual(negotiate("*/*"), JSON_MEDIA_TYPE)
+        self.assertEqual(negotiate("text/csv"), JSON_MEDIA_TYPE)
+
+    def test_negotiate_respects_quality(self):
+        """
+        Test that the media type with the highest q value wins.
+        """
+        accept = "application/json;q=0.5, application/vnd.apache.arrow.stream, application/x-msgpack;q=0.9"
+
+        self.assertEqual(negotiate(accept), ARROW_STREAM_MEDIA_TYPE)
+        self.assertEqual(negotiate("application/x-msgpack"), MSGPACK_MEDIA_TYPE)
+
+    def test_encode_msgpack_round_trip(self):
+        """
+        Test that MessagePack output decodes to the original columns and rows.
+        """
+        decoded = msgpack.unpackb(encode_msgpack(ROWS))
+
+        self.assertEqual(decoded["columns"], ["id", "fullname", "age", "email", "location"])
+        self.assertEqual([tuple(row) for row in decoded["rows"]], ROWS)
+
+    def test_encode_arrow_round_trip(self):
+        """
+        Test that the Arrow IPC stream decodes to a table with the original rows.
+        """
+        table = pyarrow.ipc.open_stream(encode_arrow(ROWS)).read_all()
+
+        self.assertEqual(table.column_names, ["id", "fullname", "age", "email", "location"])
+        self.assertEqual(table.column("age").to_pylist(), [30, None])
+
+    def test_encode_arrow_empty(self):
+        """
+        Test that an empty listing still produces a valid stream with the schema.
+        """
+        table = pyarrow.ipc.open_stream(encode_arrow([])).read_all()
+
+        self.assertEqual(table.num_rows, 0)
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_listing_varies_on_accept_for_every_format(self, mock_get_all_user):
+        """
+        Test that GET /user sends `Vary: Accept` for the JSON envelope as well as binary formats.
+        """
+        mock_get_all_user.return_value = ROWS
+        app = FastAPI()
+        app.include_router(users_ct.router)
+        client = TestClient(app)
+
+        for accept in (None, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE):
+            with self.subTest(accept=accept):
+                response = client.get("/user", headers={"Accept": accept} if accept else {})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers["vary"], "Accept")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_stale_binary_listing_is_marked(self, mock_get_all_user):
+        """
+        Test that a binary listing served from its snapshot during an outage carries `X-Stale`.
+        """
+        # Arrange
+        UsersRepository.reset()
+        self.addCleanup(UsersRepository.reset)
+        mock_get_all_user.side_effect = [ROWS, ConnectionError("Connection error")]
+        app = FastAPI()
+        app.include_router(users_ct.router)
+        client = TestClient(app)
+        fresh = client.get("/user", headers={"Accept": MSGPACK_MEDIA_TYPE})
+
+        # Act
+        stale = client.get("/user", headers={"Accept": MSGPACK_MEDIA_TYPE})
+
+        # Assert
+        self.assertNotIn("x-stale", fresh.headers)
+        self.assertEqual(stale.headers["x-stale"], "true")
+        self.assertEqual(msgpack.unpackb(stale.content)["rows"][0][0], "id-1")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_failed_binary_listing_returns_json_envelope(self, mock_get_all_user):
+        """
+        Test that a binary listing request answers with the JSON error envelope when the users cannot be read.
+        """
+        UsersRepository.reset()
+        self.addCleanup(UsersRepository.reset)
+        mock_get_all_user.side_effect = ConnectionError("Connection error")
+        app = FastAPI()
+        app.include_router(users_ct.router)
+        client = TestClient(app)
+
+        response = client.get("/user", headers={"Accept": MSGPACK_MEDIA_TYPE})
+
+        self.assertEqual(response.json()["message"], "failed to connect to the database")
+        self.assertEqual(response.headers["vary"], "Accept")
@@ -0,0 +1,86 @@
+import time
+import unittest
+import uuid
+from unittest.mock import patch
+from src.services.ids import uuid7, uuid7_time
+
+class TestUuid7(unittest.TestCase):
+    """
+    Test suite for the time-ordered user ID generator.
+    """
+
+    def setUp(self):
+        # Tests that move the clock must not leave the generator ahead of real time.
+        state = patch.multiple("src.services.ids", _last_ms=0, _counter=0)
+        state.start()
+        self.addCleanup(state.stop)
+
+    def test_is_a_version_7_uuid(self):
+        """
+        Test that generated IDs carry the UUIDv7 version and RFC 9562 variant.
+        """
+        value = uuid7()
+
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    def test_encodes_the_creation_time(self):
+        """
+        Test that the timestamp of a new ID is the current time.
+        """
+        before = time.time()
+
+        created = uuid7_time(uuid7())
+
+        self.assertGreaterEqual(created, int(before * 1000) / 1000)
+        self.assertLessEqual(created, time.time())
+
+    def test_ids_are_strictly_increasing(self):
+        """
+        Test that IDs, and their text form, sort in creation order.
+        """
+        ids = [uuid7() for _ in range(10_000)]
+
+        self.assertEqual(sorted(ids), ids)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(sorted(str(value) for value in ids), [str(value) for value in ids])
+
+    def test_counter_overflow_advances_the_timestamp(self):
+        """
+        Test that more IDs than the counter holds within one millisecond stay increasing.
+        """
+        # Arrange
+        frozen = (int(time.time() * 1000) + 60_000) * 1_000_000
+
+        # Act
+        with patch("src.services.ids.time.time_ns", return_value=frozen):
+            ids = [uuid7() for _ in range(5_000)]
+
+        # Assert
+        self.assertEqual(sorted(ids), ids)
+        self.assertGreater(uuid7_time(ids[-1]), uuid7_time(ids[0]))
+
+    def test_clock_going_backwards_keeps_ids_increasing(self):
+        """
+        Test that an ID created after the clock went backwards still sorts after earlier ones.
+        """
+        # Arrange
+        now = time.time_ns()
+        with patch("src.services.ids.time.time_ns", return_value=now + 120_000_000_000):
+            later = uuid7()
+
+        # Act
+        earlier_clock = uuid7()
+
+        # Assert
+        self.assertGreater(earlier_clock, later)
+
+    def test_time_of_a_uuid4_is_rejected(self):
+        """
+        Test that `uuid7_time` refuses IDs that carry no timestamp.
+        """
+        with self.assertRaises(ValueError):
+            uuid7_time(uuid.uuid4())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import logging
+import queue
+import unittest
+from src.logs import (
+    DroppingQueueHandler,
+    DropReportingListener,
+    DuplicateFilter,
+    JsonFormatter,
+    RequestContextFilter,
+    request_id_var,
+)
+
+def make_record(msg="Database connection error: %s", args=("timeout",), level=logging.ERROR):
+    return logging.LogRecord("root", level, __file__, 1, msg, args, None)
+
+class TestLogs(unittest.TestCase):
+    """
+    Test suite for the queue-backed logging pipeline.
+    """
+
+    def test_json_formatter_includes_request_id(self):
+        """
+        Test that records are formatted as JSON with the request ID of the current context.
+        """
+        token = request_id_var.set("req-1")
+        try:
+            record = make_record()
+            RequestContextFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry["request_id"], "req-1")
+        self.assertEqual(entry["message"], "Database connection error: timeout")
+        self.assertEqual(entry["level"], "ERROR")
+
+    def test_duplicate_records_are_suppressed(self):
+        """
+        Test that identical repeats within the window are dropped, and different messages pass.
+        """
+        duplicate_filter = DuplicateFilter(window=60)
+
+        self.assertTrue(duplicate_filter.filter(make_record()))
+        self.assertTrue(duplicate_filter.filter(make_record(args=("refused",))))
+        self.assertFalse(duplicate_filter.filter(make_record()))
+        self.assertFalse(duplicate_filter.filter(make_record()))
+        self.assertTrue(duplicate_filter.filter(make_record(msg="Data error occurred: %s")))
+
+    def test_records_below_warning_are_never_suppressed(self):
+        """
+        Test that access records sharing a message template all pass.
+        """
+        duplicate_filter = DuplicateFilter(window=60)
+
+        passed = [
+            duplicate_filter.filter(make_record(msg="%s %s %s", args=("GET", path, 200), level=logging.INFO))
+            for path in ("/user", "/user", "/users/search")
+        ]
+
+        self.assertEqual(passed, [True, True, True])
+
+    def test_suppressed_count_is_reported_when_the_window_closes(self):
+        """
+        Test that a summary record with the suppressed count is logged once the window has closed.
+        """
+        # Arrange
+        duplicate_filter = DuplicateFilter(window=60)
+        for _ in range(3):
+            duplicate_filter.filter(make_record())
+        duplicate_filter._seen[("root", logging.ERROR, "Database connection error: timeout")][0] -= 120
+        duplicate_filter._next_sweep = 0
+
+        # Act
+        with self.assertLogs(level=logging.ERROR) as logs:
+            passed = duplicate_filter.filter(make_record(msg="Data error occurred: %s"))
+
+        # Assert
+        self.assertTrue(passed)
+        self.assertEqual(logs.records[0].suppressed, 2)
+        self.assertIn("Database connection error: timeout", logs.records[0].getMessage())
+
+    def test_flush_reports_open_windows(self):
+        """
+        Test that flushing reports the repeats suppressed in windows that are still open.
+        """
+        duplicate_filter = DuplicateFilter(window=60)
+        for _ in range(4):
+            duplicate_filter.filter(make_record())
+
+        with self.assertLogs(level=logging.ERROR) as logs:
+            duplicate_filter.flush()
+
+        self.assertEqual(logs.records[0].suppressed, 3)
+
+    def test_full_queue_drops_records(self):
+        """
+        Test that the queue handler drops records instead of blocking when the queue is full.
+        """
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_dropped_records_are_reported_once_the_queue_drains(self):
+        """
+        Test that the listener reports the number of dropped records after handling the queued ones.
+        """
+        # Arrange
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        for _ in range(3):
+            handler.handle(make_record())
+        written = []
+        output = logging.Handler()
+        output.emit = written.append
+        listener = DropReportingListener(handler, output)
+
+        # Act
+        listener.handle(handler.queue.get_nowait())
+        listener.handle(make_record())
+
+        # Assert
+        self.assertEqual([getattr(record, "dropped", None) for record in written], [None, 2, None])
+        self.assertEqual(written[1].levelno, logging.WARNING)
+        self.assertEqual(json.loads(JsonFormatter().format(written[1]))["dropped"], 2)
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from src.migrations.runner import LOCK_ID, _lock, created_indexes, load_migrations, split_statements
+
+class TestMigrations(unittest.TestCase):
+    """
+    Test suite for the migration runner's parsing of migration files.
+    """
+
+    def test_split_statements_ignores_comments(self):
+        """
+        Test that migrations are split on semicolons and comment lines are dropped.
+        """
+        sql = "-- migrate: no-transaction\n-- comment\nCREATE INDEX a ON users (age);\n\nSELECT 1;\n"
+
+        self.assertEqual(split_statements(sql), ["CREATE INDEX a ON users (age)", "SELECT 1"])
+
+    def test_created_indexes_lists_the_migration_indexes(self):
+        """
+        Test that the indexes a migration creates are found in every CREATE INDEX form.
+        """
+        statements = [
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_email_key ON users (email)",
+            "create index concurrently users_age_idx on users (age)",
+            "CREATE INDEX public.users_location_idx ON users (location)",
+            "ALTER TABLE users ADD COLUMN note TEXT",
+        ]
+
+        self.assertEqual(created_indexes(statements), ["users_email_key", "users_age_idx", "public.users_location_idx"])
+
+    def test_shipped_index_migrations_name_their_indexes(self):
+        """
+        Test that every concurrent index migration in the repository is checked for invalid indexes.
+        """
+        for version, name, sql in load_migrations():
+            statements = split_statements(sql)
+            creates = [statement for statement in statements if "INDEX" in statement.upper()]
+            with self.subTest(migration=f"{version:04d}_{name}"):
+                self.assertEqual(len(created_indexes(creates)), len(creates))
+
+    @patch('src.migrations.runner.time.sleep')
+    def test_lock_is_polled_instead_of_awaited(self, mock_sleep):
+        """
+        Test that a runner waiting for the migration lock retries without a blocking statement.
+        """
+        # Arrange
+        cursor = MagicMock()
+        cursor.fetchone.side_effect = [(False,), (False,), (True,)]
+
+        # Act
+        _lock(cursor)
+
+        # Assert
+        self.assertEqual(mock_sleep.call_count, 2)
+        for call in cursor.execute.call_args_list:
+            self.assertEqual(call.args, ("SELECT pg_try_advisory_lock(%s)", (LOCK_ID,)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from src.dtos.write.users import UsersPatch, UsersWrite
+from src.repositories.ngram_index import NgramIndex, trigrams
+from src.repositories.users_mem import UsersMemoryRepository
+
+class TestNgramIndex(unittest.TestCase):
+    """
+    Test suite for the in-process trigram index and the memory repository's search.
+    """
+
+    def setUp(self):
+        self.index = NgramIndex(fields=("fullname", "location"))
+        self.index.add("id-1", {"fullname": "Jon Smith", "location": "Accra"})
+        self.index.add("id-2", {"fullname": "John Smithers", "location": "Kumasi"})
+        self.index.add("id-3", {"fullname": "Ama Mensah", "location": "Tema"})
+
+    def test_trigrams_match_pg_trgm(self):
+        """
+        Test that words are lower-cased and padded like pg_trgm does.
+        """
+        self.assertEqual(trigrams("Jon"), {"  j", " jo", "jon", "on "})
+
+    def test_search_ranks_closest_match_first(self):
+        """
+        Test that a misspelled name finds the closest user first.
+        """
+        results = self.index.search("jon smit", limit=10)
+
+        self.assertEqual([key for key, _ in results], ["id-1", "id-2"])
+
+    def test_search_matches_location(self):
+        """
+        Test that the location field is searched as well.
+        """
+        results = self.index.search("acra", limit=10)
+
+        self.assertEqual([key for key, _ in results], ["id-1"])
+
+    def test_search_respects_limit_and_removal(self):
+        """
+        Test that results are limited and removed documents are no longer found.
+        """
+        self.assertEqual(len(self.index.search("smith", limit=1)), 1)
+
+        self.index.remove("id-1")
+
+        self.assertEqual([key for key, _ in self.index.search("jon smit", limit=10)], ["id-2"])
+
+    def test_memory_repository_search_follows_updates(self):
+        """
+        Test that the memory repository reindexes users when they are patched.
+        """
+        UsersMemoryRepository.add_user(
+            UsersWrite(fullname="Kofi Boateng", age=30, email="kofi@example.com", location="Accra"), "mem-1"
+        )
+        self.addCleanup(UsersMemoryRepository.delete_user, "mem-1")
+
+        UsersMemoryRepository.patch_user("mem-1", UsersPatch(fullname="Kwame Boateng").model_dump(exclude_unset=True))
+
+        self.assertEqual(UsersMemoryRepository.search_users("kwame boatng", 5)[0][0], "mem-1")
+        self.assertEqual(UsersMemoryRepository.search_users("kofi", 5), [])
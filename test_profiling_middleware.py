@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from src.middlewares.profiling import ProfilingMiddleware
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+async def slow_endpoint(scope, receive, send):
+    await asyncio.sleep(0.05)
+    await endpoint(scope, receive, send)
+
+async def request(middleware, headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/user", "headers": list(headers)}
+    await middleware(scope, receive, send)
+    return messages
+
+def run_request(middleware, headers=()):
+    """
+    Runs a single HTTP request through the middleware and returns the sent messages.
+    """
+    return asyncio.run(request(middleware, headers))
+
+class TestProfilingMiddleware(unittest.TestCase):
+    """
+    Test suite for the ProfilingMiddleware class.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = directory.name
+
+    def test_request_not_profiled_without_header(self):
+        """
+        Test that requests pass through untouched when neither the header nor sampling applies.
+        """
+        middleware = ProfilingMiddleware(endpoint, sample_rate=0, output_dir=self.output_dir)
+
+        messages = run_request(middleware)
+
+        self.assertEqual(messages[1]["body"], b"ok")
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_header_writes_profile_file(self):
+        """
+        Test that the profiling header writes a .prof file and keeps the endpoint's response.
+        """
+        middleware = ProfilingMiddleware(endpoint, secret="s3cret", sample_rate=0, output_dir=self.output_dir)
+
+        messages = run_request(middleware, headers=[(b"x-profile", b"s3cret")])
+
+        self.assertEqual(messages[1]["body"], b"ok")
+        self.assertEqual(len(os.listdir(self.output_dir)), 1)
+
+    def test_inline_header_returns_profile(self):
+        """
+        Test that `X-Profile: inline:<secret>` replaces the response body with the profile report.
+        """
+        middleware = ProfilingMiddleware(endpoint, secret="s3cret", sample_rate=0, output_dir=self.output_dir)
+
+        messages = run_request(middleware, headers=[(b"x-profile", b"inline:s3cret")])
+
+        self.assertIn(b"request time", messages[1]["body"])
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_sample_rate_profiles_without_header(self):
+        """
+        Test that a sample rate of 1.0 profiles every request.
+        """
+        middleware = ProfilingMiddleware(endpoint, sample_rate=1.0, output_dir=self.output_dir)
+
+        run_request(middleware)
+
+        self.assertEqual(len(os.listdir(self.output_dir)), 1)
+
+    def test_header_ignored_without_matching_secret(self):
+        """
+        Test that the header does nothing without a configured secret or with a wrong one.
+        """
+        for secret, value in (("", b"inline"), ("", b"inline:"), ("s3cret", b"inline:guess"), ("s3cret", b"1")):
+            with self.subTest(secret=secret, value=value):
+                middleware = ProfilingMiddleware(endpoint, secret=secret, sample_rate=0, output_dir=self.output_dir)
+
+                messages = run_request(middleware, headers=[(b"x-profile", value)])
+
+                self.assertEqual(messages[1]["body"], b"ok")
+                self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_no_files_written_beyond_limit(self):
+        """
+        Test that requests are served without profiling once the directory holds `max_files` profiles.
+        """
+        middleware = ProfilingMiddleware(endpoint, sample_rate=1.0, output_dir=self.output_dir, max_files=2)
+
+        responses = [run_request(middleware) for _ in range(4)]
+
+        self.assertTrue(all(messages[1]["body"] == b"ok" for messages in responses))
+        self.assertEqual(len(os.listdir(self.output_dir)), 2)
+
+    def test_overlapping_requests_are_served(self):
+        """
+        Test that a request arriving while another is profiled is served without profiling.
+        """
+        middleware = ProfilingMiddleware(slow_endpoint, sample_rate=1.0, output_dir=self.output_dir)
+
+        async def overlapping():
+            return await asyncio.gather(request(middleware), request(middleware))
+
+        responses = asyncio.run(overlapping())
+
+        self.assertTrue(all(messages[1]["body"] == b"ok" for messages in responses))
+        self.assertEqual(len(os.listdir(self.output_dir)), 1)
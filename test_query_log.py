@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from src.repositories import query_log
+from src.repositories.query_log import ExplainRateLimiter, execute, parameter_shapes, redact_plan
+
+class TestQueryLog(unittest.TestCase):
+    """
+    Test suite for the repository slow-query log.
+    """
+
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.explain_cursor = self.cursor.connection.cursor.return_value
+        self.explain_cursor.fetchall.return_value = [("Index Scan using users_pkey on users",)]
+
+    def test_parameter_shapes_hide_values(self):
+        """
+        Test that parameter shapes describe types and lengths but never values.
+        """
+        shapes = parameter_shapes(("secret@example.com", 30, None))
+
+        self.assertEqual(shapes, ["str(18)", "int", "NoneType"])
+
+    @patch.object(query_log, "explain_limiter", ExplainRateLimiter(0))
+    def test_fast_query_not_logged(self):
+        """
+        Test that statements under the threshold are executed without capturing a plan.
+        """
+        with self.assertNoLogs(level="WARNING"):
+            execute(self.cursor, "SELECT 1", threshold_ms=10_000)
+
+        self.cursor.execute.assert_called_once_with("SELECT 1", None)
+        self.explain_cursor.execute.assert_not_called()
+
+    @patch.object(query_log, "explain_limiter", ExplainRateLimiter(0))
+    def test_slow_read_captures_analyze_plan(self):
+        """
+        Test that slow reads are logged with an EXPLAIN (ANALYZE, BUFFERS) plan.
+        """
+        query = "SELECT id FROM users WHERE id = %s"
+
+        with self.assertLogs(level="WARNING") as logs:
+            execute(self.cursor, query, ("user-id",), threshold_ms=0)
+
+        self.explain_cursor.execute.assert_any_call(f"EXPLAIN (ANALYZE, BUFFERS) {query}", ("user-id",))
+        self.assertIn("Index Scan", logs.output[0])
+        self.assertNotIn("user-id", logs.output[0])
+
+    @patch.object(query_log, "explain_limiter", ExplainRateLimiter(0))
+    def test_logged_plan_hides_parameter_values(self):
+        """
+        Test that parameter values inlined into the plan by psycopg2 are not logged.
+        """
+        # Arrange
+        self.explain_cursor.fetchall.return_value = [
+            ("Index Scan using users_email_key on users  (cost=0.42..8.44 rows=1 width=64)",),
+            ("  Index Cond: (email = 'john.o''brien@example.com'::text)",),
+            ("  Filter: (('jon smit'::text <% fullname) AND (age > 57))",),
+            ("  Rows Removed by Filter: 3",),
+        ]
+
+        # Act
+        with self.assertLogs(level="WARNING") as logs:
+            execute(self.cursor, "SELECT id FROM users WHERE email = %s", ("john.o'brien@example.com",), threshold_ms=0)
+
+        # Assert
+        self.assertNotIn("example.com", logs.output[0])
+        self.assertNotIn("jon smit", logs.output[0])
+        self.assertNotIn("57", logs.output[0])
+        self.assertIn("Index Cond: (email = ?::text)", logs.output[0])
+        self.assertIn("Filter: ((?::text <% fullname) AND (age > ?))", logs.output[0])
+        self.assertIn("cost=0.42..8.44 rows=1", logs.output[0])
+        self.assertIn("Rows Removed by Filter: 3", logs.output[0])
+
+    def test_redact_plan_keeps_identifiers(self):
+        """
+        Test that numbers in column names and the type modifiers of casts are not mistaken for values.
+        """
+        plan = ("Index Cond: ((col2 = ?::numeric(10,2)) AND (name = 'x'::character varying(20)) "
+                "AND (age > 30) AND (id = ANY ('{a,b}'::text[])))")
+
+        self.assertEqual(
+            redact_plan(plan),
+            "Index Cond: ((col2 = ?::numeric(10,2)) AND (name = ?::character varying(20)) "
+            "AND (age > ?) AND (id = ANY (?::text[])))",
+        )
+
+    @patch.object(query_log, "explain_limiter", ExplainRateLimiter(0))
+    def test_slow_write_is_not_analyzed(self):
+        """
+        Test that slow writes are explained without ANALYZE so they are not applied twice.
+        """
+        query = "DELETE FROM users WHERE id = %s"
+
+        with self.assertLogs(level="WARNING"):
+            execute(self.cursor, query, ("user-id",), threshold_ms=0)
+
+        self.explain_cursor.execute.assert_any_call(f"EXPLAIN {query}", ("user-id",))
+
+    @patch.object(query_log, "explain_limiter", ExplainRateLimiter(3600))
+    def test_plan_capture_is_rate_limited(self):
+        """
+        Test that only one plan is captured per interval.
+        """
+        with self.assertLogs(level="WARNING"):
+            execute(self.cursor, "SELECT 1", threshold_ms=0)
+            execute(self.cursor, "SELECT 1", threshold_ms=0)
+
+        explains = [c for c in self.explain_cursor.execute.call_args_list if c.args[0].startswith("EXPLAIN")]
+        self.assertEqual(len(explains), 1)
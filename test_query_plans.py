@@ -0,0 +1,151 @@
+"""
+Plan-regression check for the repository's queries.
+
+Seeds a large users table in the database given by `TEST_DATABASE_URL`, runs every
+UsersRepository and sharded repository query and asserts that Postgres does not plan a
+sequential scan for any of them, nor a sort for the sharded listing. Use a dedicated database: 100k rows are inserted into it and deleted afterwards.
+Skipped when `TEST_DATABASE_URL` is not set.
+"""
+import json
+import os
+import unittest
+from unittest.mock import patch
+import psycopg2
+from src.configs import database_cursor, use_database
+from src.dtos.write.users import UsersPatch, UsersWrite
+from src.migrations.runner import migrate
+from src.repositories import query_log
+from src.repositories.users_rp import UsersRepository
+from src.repositories.users_sharded import ShardedUsersRepository, ShardRepository
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SEED_ROWS = 100_000
+PREFIX = "plan-check-"
+
+# Queries that read the whole table by design and are allowed to scan it.
+FULL_SCANS = {
+    "SELECT id, fullname, age, email, location FROM users",
+    "SELECT email FROM users WHERE email IS NOT NULL",
+    "SELECT id, email FROM users WHERE email IS NOT NULL",
+}
+
+def plan_nodes(plan: dict):
+    """
+    Yields every node of a JSON query plan.
+    """
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+@unittest.skipUnless(TEST_DATABASE_URL, "requires TEST_DATABASE_URL")
+class TestQueryPlans(unittest.TestCase):
+    """
+    Test suite asserting that repository queries are served by indexes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        migrate(TEST_DATABASE_URL)
+        with database_cursor(TEST_DATABASE_URL) as cursor:
+            cursor.execute(
+                "INSERT INTO users(id, fullname, age, email, location) "
+                "SELECT %s || n, 'User ' || n, 18 + n %% 60, %s || n || '@example.com', 'City ' || n %% 500 "
+                "FROM generate_series(1, %s) AS n ON CONFLICT DO NOTHING",
+                (PREFIX, PREFIX, SEED_ROWS,),
+            )
+        connection = psycopg2.connect(TEST_DATABASE_URL)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE users")
+        connection.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        with database_cursor(TEST_DATABASE_URL) as cursor:
+            cursor.execute("DELETE FROM users WHERE id LIKE %s", (PREFIX + "%",))
+
+    def run_repository(self) -> list[tuple[str, tuple]]:
+        """
+        Calls every repository method and returns the statements they executed.
+        """
+        statements = []
+        execute = query_log.execute
+
+        def record(cursor, query, params=None, **kwargs):
+            statements.append((query, params))
+            return execute(cursor, query, params, **kwargs)
+
+        with patch('src.repositories.users_rp.execute', side_effect=record), use_database(TEST_DATABASE_URL):
+            userid = PREFIX + "new"
+            user = UsersWrite(fullname="Plan Check", age=30, email=PREFIX + "new@example.com", location="USA")
+            UsersRepository.add_user(user, userid)
+            UsersRepository.get_user_by_id(userid)
+            UsersRepository.get_user_by_email(user.email)
+            UsersRepository.update_user(userid, user)
+            UsersRepository.patch_user(userid, UsersPatch(age=31).model_dump(exclude_unset=True))
+            UsersRepository.search_users("jon smit", 20)
+            UsersRepository.get_all_user()
+            list(UsersRepository.get_all_emails())
+            UsersRepository.delete_user(userid)
+
+        return statements
+
+    def run_shard(self) -> list[tuple[str, tuple]]:
+        """
+        Calls the fan-out reads of a shard repository and returns the statements they executed.
+        """
+        statements = []
+        execute = query_log.execute
+
+        def record(cursor, query, params=None, **kwargs):
+            statements.append((query, params))
+            return execute(cursor, query, params, **kwargs)
+
+        with patch('src.repositories.users_sharded.execute', side_effect=record), \
+                patch.object(ShardedUsersRepository, "shards", [TEST_DATABASE_URL]):
+            repository = ShardRepository(TEST_DATABASE_URL)
+            repository.get_all_user()
+            list(repository.get_all_emails())
+            repository.search_users("jon smit", 20)
+
+        return statements
+
+    def plan(self, cursor, query: str, params) -> dict:
+        """
+        Returns the JSON plan of a statement.
+        """
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+        plan = cursor.fetchone()[0][0]["Plan"]
+        return json.loads(plan) if isinstance(plan, str) else plan
+
+    def test_repository_queries_avoid_sequential_scans(self):
+        """
+        Test that no repository query is planned as a sequential scan on the seeded table.
+        """
+        statements = self.run_repository() + self.run_shard()
+
+        with database_cursor(TEST_DATABASE_URL) as cursor:
+            for query, params in statements:
+                if query in FULL_SCANS:
+                    continue
+                plan = self.plan(cursor, query, params)
+
+                with self.subTest(query=query):
+                    scans = [node["Node Type"] for node in plan_nodes(plan) if node["Node Type"] == "Seq Scan"]
+                    self.assertEqual(scans, [], f"sequential scan planned for: {query}")
+            cursor.connection.rollback()
+
+    def test_sharded_listing_is_read_in_merge_order(self):
+        """
+        Test that a shard's listing is read in code-point ID order from an index, without sorting.
+        """
+        listings = [(query, params) for query, params in self.run_shard() if "ORDER BY id" in query]
+        self.assertEqual(len(listings), 1)
+
+        with database_cursor(TEST_DATABASE_URL) as cursor:
+            plan = self.plan(cursor, *listings[0])
+            cursor.connection.rollback()
+
+        nodes = [node["Node Type"] for node in plan_nodes(plan)]
+        self.assertNotIn("Seq Scan", nodes)
+        self.assertNotIn("Sort", nodes)
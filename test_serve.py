@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import patch
+import uvicorn_worker
+import serve
+
+class TestServe(unittest.TestCase):
+    """
+    Test suite for the worker and connection pool sizing of the production launcher.
+    """
+
+    @patch('serve._read')
+    def test_cgroup_v2_quota(self, mock_read):
+        """
+        Test that a cgroup v2 quota is converted to a number of CPUs.
+        """
+        mock_read.side_effect = lambda path: "150000 100000" if path.endswith("cpu.max") else None
+
+        self.assertEqual(serve.cgroup_cpu_limit(), 1.5)
+
+    @patch('serve._read')
+    def test_cgroup_v2_unlimited(self, mock_read):
+        """
+        Test that an unlimited cgroup v2 quota is reported as no limit.
+        """
+        mock_read.side_effect = lambda path: "max 100000" if path.endswith("cpu.max") else None
+
+        self.assertIsNone(serve.cgroup_cpu_limit())
+
+    @patch('serve.cgroup_cpu_limit', return_value=1.5)
+    @patch('os.sched_getaffinity', return_value=set(range(16)))
+    def test_available_cpus_respects_quota(self, _mock_affinity, _mock_limit):
+        """
+        Test that the cgroup quota caps the CPU count and is rounded up.
+        """
+        self.assertEqual(serve.available_cpus(), 2)
+
+    @patch.dict('os.environ', {"DATABASE_MAX_CONNECTIONS": "100", "DATABASE_RESERVED_CONNECTIONS": "10"})
+    def test_pool_size_fits_connection_budget(self):
+        """
+        Test that two generations of workers never exceed the connection budget.
+        """
+        for workers in (1, 2, 4, 8, 16):
+            self.assertLessEqual(2 * workers * serve.pool_size(workers), 90)
+        self.assertEqual(serve.pool_size(4), 11)
+
+    @patch.dict('os.environ', {"WEB_CONCURRENCY": "2"}, clear=True)
+    def test_options_use_maintained_worker_and_explicit_timeout(self):
+        """
+        Test that workers come from the uvicorn-worker package and get an explicit boot and heartbeat timeout.
+        """
+        settings = serve.options()
+
+        self.assertTrue(issubclass(settings["worker_class"], uvicorn_worker.UvicornWorker))
+        self.assertEqual(settings["timeout"], 120)
+        self.assertEqual(settings["workers"], 2)
+
+    @patch.dict('os.environ', {"WEB_CONCURRENCY": "4", "EMAIL_FILTER_ENABLED": "true"}, clear=True)
+    def test_email_filter_requires_single_worker(self):
+        """
+        Test that the launcher refuses several workers while the per-process email filter is enabled.
+        """
+        with self.assertRaises(ValueError):
+            serve.options()
+
+        with patch.dict('os.environ', {"WEB_CONCURRENCY": "1"}):
+            self.assertEqual(serve.options()["workers"], 1)
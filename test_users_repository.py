@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch
+from src.repositories.users_rp import UsersRepository
+
+@patch('src.repositories.users_rp.execute')
+@patch('src.repositories.users_rp.database_cursor')
+class TestUsersRepositoryPatch(unittest.TestCase):
+    """
+    Test suite for the UPDATE statements built by UsersRepository.patch_user.
+    """
+
+    def test_patch_user_updates_only_given_columns(self, mock_cursor, mock_execute):
+        """
+        Test that only the supplied columns are set, in a fixed column order.
+        """
+        cursor = mock_cursor.return_value.__enter__.return_value
+
+        UsersRepository.patch_user("id-1", {"location": "X", "age": 3})
+
+        mock_execute.assert_called_once_with(
+            cursor, "UPDATE users SET age=%s, location=%s WHERE id=%s", (3, "X", "id-1",)
+        )
+
+    def test_patch_user_without_fields_does_nothing(self, mock_cursor, mock_execute):
+        """
+        Test that an empty patch does not touch the database.
+        """
+        UsersRepository.patch_user("id-1", {})
+
+        mock_cursor.assert_not_called()
+        mock_execute.assert_not_called()
+
+    def test_patch_user_rejects_unknown_columns(self, mock_cursor, mock_execute):
+        """
+        Test that columns outside the whitelist raise ValueError before any query runs.
+        """
+        with self.assertRaises(ValueError):
+            UsersRepository.patch_user("id-1", {"age": 3, "id = id; --": "x"})
+
+        mock_cursor.assert_not_called()
+        mock_execute.assert_not_called()
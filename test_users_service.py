@@ -1,6 +1,12 @@
 import unittest
 from unittest.mock import patch
-from src.dtos.write.users import UsersWrite
+import msgpack
+from src.dtos.encoders import MSGPACK_MEDIA_TYPE
+from src.dtos.write.users import UsersPatch, UsersWrite
+from src.repositories.users_ab import EmailTakenError
+from src.repositories.users_backend import UsersRepository
+from src.services.email_filter import EmailFilter
+from src.services.users_ab import UsersServiceError
 from src.services.users_sv import UsersService
 
 class TestUsersService(unittest.TestCase):
@@ -8,6 +14,10 @@ class TestUsersService(unittest.TestCase):
     Test suite for the UsersService class, covering various scenarios for user operations.
     """
 
+    def setUp(self):
+        # Circuit breaker state and read snapshots are process-wide; isolate every test.
+        UsersRepository.reset()
+
     @patch('src.repositories.users_rp.UsersRepository.add_user')
     def test_add_user_success(self, mock_add_user):
         """
@@ -47,6 +57,25 @@ class TestUsersService(unittest.TestCase):
         self.assertEqual(response.message, "an error occurred while processing user data")
         self.assertEqual(response.data, [])
 
+    @patch('src.repositories.users_rp.UsersRepository.add_user')
+    def test_add_user_email_taken(self, mock_add_user):
+        """
+        Test the addition of a user whose email belongs to another user.
+
+        Mocks the add_user method to simulate a unique email violation and asserts 
+        that the response reports the taken email.
+        """
+        # Arrange
+        user_data = UsersWrite(fullname="John Doe", email="john@example.com", location="USA", age=30)
+        mock_add_user.side_effect = EmailTakenError("email already taken")
+
+        # Act
+        response = UsersService.add_user(user_data)
+
+        # Assert
+        self.assertEqual(response.message, "email already taken")
+        self.assertEqual(response.data, [])
+
     @patch('src.repositories.users_rp.UsersRepository.add_user')
     def test_add_user_connection_error(self, mock_add_user):
         """
@@ -282,4 +311,314 @@ class TestUsersService(unittest.TestCase):
 
         # Assert
         self.assertEqual(response.message, "failed to connect to the database")
-        self.assertEqual(response.data, [])
\ No newline at end of file
+        self.assertEqual(response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_get_all_user_encoded_msgpack(self, mock_get_all_user):
+        """
+        Test the retrieval of all users encoded as MessagePack.
+
+        Mocks the get_all_user method to return repository rows and asserts 
+        that the rows are encoded without going through the response envelope.
+        """
+        # Arrange
+        mock_get_all_user.return_value = [("test-user-id", "John Doe", 30, "john@example.com", "USA")]
+
+        # Act
+        content, stale = UsersService.get_all_user_encoded(MSGPACK_MEDIA_TYPE)
+
+        # Assert
+        self.assertFalse(stale)
+        self.assertEqual(msgpack.unpackb(content)["rows"][0][0], "test-user-id")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_get_all_user_encoded_connection_error(self, mock_get_all_user):
+        """
+        Test the encoded retrieval of all users when there is a database connection error.
+
+        Mocks the get_all_user method to simulate a ConnectionError and asserts 
+        that the JSON error response is raised instead of an encoded body being returned.
+        """
+        # Arrange
+        mock_get_all_user.side_effect = ConnectionError("Connection error")
+
+        # Act
+        with self.assertRaises(UsersServiceError) as error:
+            UsersService.get_all_user_encoded(MSGPACK_MEDIA_TYPE)
+
+        # Assert
+        self.assertEqual(error.exception.response.message, "failed to connect to the database")
+        self.assertEqual(error.exception.response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_id')
+    @patch('src.repositories.users_rp.UsersRepository.patch_user')
+    def test_patch_user_writes_changed_fields_only(self, mock_patch_user, mock_get_user_by_id):
+        """
+        Test the partial update of a user.
+
+        Mocks the get_user_by_id and patch_user methods and asserts that only the 
+        supplied fields that differ from the stored user are written.
+        """
+        # Arrange
+        userid = "test-user-id"
+        user_data = UsersPatch(fullname="John Doe", location="Canada")
+        mock_get_user_by_id.return_value = ("test-user-id", "John Doe", 30, "john@example.com", "USA")
+
+        # Act
+        response = UsersService.patch_user(userid, user_data)
+
+        # Assert
+        mock_patch_user.assert_called_once_with(userid=userid, fields={"location": "Canada"})
+        self.assertEqual(response.message, "user updated")
+        self.assertEqual(response.data[0].location, "Canada")
+        self.assertEqual(response.data[0].email, "john@example.com")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_id')
+    @patch('src.repositories.users_rp.UsersRepository.patch_user')
+    def test_patch_user_unchanged_skips_write(self, mock_patch_user, mock_get_user_by_id):
+        """
+        Test the partial update of a user with values equal to the stored ones.
+
+        Mocks the get_user_by_id method and asserts that no write is issued.
+        """
+        # Arrange
+        userid = "test-user-id"
+        user_data = UsersPatch(age=30)
+        mock_get_user_by_id.return_value = ("test-user-id", "John Doe", 30, "john@example.com", "USA")
+
+        # Act
+        response = UsersService.patch_user(userid, user_data)
+
+        # Assert
+        mock_patch_user.assert_not_called()
+        self.assertEqual(response.message, "user unchanged")
+        self.assertEqual(response.data[0].age, 30)
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_id')
+    @patch('src.repositories.users_rp.UsersRepository.patch_user')
+    def test_patch_user_email_taken(self, mock_patch_user, mock_get_user_by_id):
+        """
+        Test the partial update of a user to an email that belongs to another user.
+
+        Mocks the patch_user method to simulate a unique email violation and asserts 
+        that the response reports the taken email.
+        """
+        # Arrange
+        userid = "test-user-id"
+        mock_get_user_by_id.return_value = ("test-user-id", "John Doe", 30, "john@example.com", "USA")
+        mock_patch_user.side_effect = EmailTakenError("email already taken")
+
+        # Act
+        response = UsersService.patch_user(userid, UsersPatch(email="jane@example.com"))
+
+        # Assert
+        self.assertEqual(response.message, "email already taken")
+        self.assertEqual(response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_id')
+    def test_patch_user_not_found(self, mock_get_user_by_id):
+        """
+        Test the partial update of a user that does not exist.
+
+        Mocks the get_user_by_id method to simulate a scenario where 
+        the user is not found and asserts that the correct response is returned.
+        """
+        # Arrange
+        userid = "non-existent-user-id"
+        mock_get_user_by_id.return_value = None
+
+        # Act
+        response = UsersService.patch_user(userid, UsersPatch(age=31))
+
+        # Assert
+        self.assertEqual(response.message, "user does not exist")
+        self.assertEqual(response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_email')
+    def test_get_user_by_email_success(self, mock_get_user_by_email):
+        """
+        Test the retrieval of a user by email.
+
+        Mocks the get_user_by_email method to simulate a successful retrieval 
+        and asserts the correct response message and data.
+        """
+        # Arrange
+        mock_get_user_by_email.return_value = ("test-user-id", "John Doe", 30, "john@example.com", "USA")
+
+        # Act
+        response = UsersService.get_user_by_email("john@example.com")
+
+        # Assert
+        self.assertEqual(response.message, "user found")
+        self.assertEqual(response.data[0].id, "test-user-id")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_email')
+    def test_get_user_by_email_filtered_out(self, mock_get_user_by_email):
+        """
+        Test the retrieval of a user by an email the Bloom filter has never seen.
+
+        Builds a filter without the email and asserts that the database is not queried.
+        """
+        # Arrange
+        email_filter = EmailFilter(capacity=1_000, error_rate=0.01)
+        email_filter.rebuild(["jane@example.com"])
+
+        # Act
+        with patch('src.services.users_sv.email_filter', email_filter):
+            response = UsersService.get_user_by_email("john@example.com")
+
+        # Assert
+        mock_get_user_by_email.assert_not_called()
+        self.assertEqual(response.message, "user does not exist")
+        self.assertEqual(response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_email')
+    def test_get_user_by_email_without_filter_queries_database(self, mock_get_user_by_email):
+        """
+        Test the retrieval of a user by email while the Bloom filter is disabled.
+
+        Uses a filter that was never built, as with `EMAIL_FILTER_ENABLED` unset, and asserts 
+        that an email written by another process is still found in the database.
+        """
+        # Arrange
+        mock_get_user_by_email.return_value = ("test-user-id", "John Doe", 30, "john@example.com", "USA")
+
+        # Act
+        with patch('src.services.users_sv.email_filter', EmailFilter(capacity=1_000, error_rate=0.01)):
+            response = UsersService.get_user_by_email("john@example.com")
+
+        # Assert
+        mock_get_user_by_email.assert_called_once_with(email="john@example.com")
+        self.assertEqual(response.message, "user found")
+
+    @patch('src.repositories.users_rp.UsersRepository.add_user')
+    def test_add_user_updates_email_filter(self, mock_add_user):
+        """
+        Test that a created user's email is recorded in the Bloom filter.
+
+        Mocks the add_user method and asserts that the new email passes the filter.
+        """
+        # Arrange
+        email_filter = EmailFilter(capacity=1_000, error_rate=0.01)
+        email_filter.rebuild([])
+        user_data = UsersWrite(fullname="John Doe", email="john@example.com", location="USA", age=30)
+
+        # Act
+        with patch('src.services.users_sv.email_filter', email_filter):
+            UsersService.add_user(user_data)
+
+        # Assert
+        self.assertTrue(email_filter.might_contain("john@example.com"))
+
+    @patch('src.repositories.users_rp.UsersRepository.search_users')
+    def test_search_users_success(self, mock_search_users):
+        """
+        Test the fuzzy search of users.
+
+        Mocks the search_users method to return ranked rows and asserts 
+        that the users are returned in the same order.
+        """
+        # Arrange
+        mock_search_users.return_value = [
+            ("id-1", "Jon Smith", 30, "jon@example.com", "USA"),
+            ("id-2", "John Smithers", 41, "john@example.com", "Canada"),
+        ]
+
+        # Act
+        response = UsersService.search_users("jon smit", 10)
+
+        # Assert
+        mock_search_users.assert_called_once_with(query="jon smit", limit=10)
+        self.assertEqual(response.message, "users found")
+        self.assertEqual([user.id for user in response.data], ["id-1", "id-2"])
+
+    @patch('src.repositories.users_rp.UsersRepository.search_users')
+    def test_search_users_no_match(self, mock_search_users):
+        """
+        Test the fuzzy search of users without matches.
+
+        Mocks the search_users method to return no rows and asserts 
+        that the correct response is returned.
+        """
+        # Arrange
+        mock_search_users.return_value = []
+
+        # Act
+        response = UsersService.search_users("zzz", 10)
+
+        # Assert
+        self.assertEqual(response.message, "no users found")
+        self.assertEqual(response.data, [])
+
+    @patch('src.repositories.users_rp.UsersRepository.get_user_by_id')
+    def test_get_user_by_id_serves_stale_data_on_connection_error(self, mock_get_user_by_id):
+        """
+        Test the retrieval of a user by ID during a database outage after a successful read.
+
+        Mocks the get_user_by_id method to succeed once and then raise a ConnectionError, 
+        and asserts that the last-known-good user is returned marked as stale.
+        """
+        # Arrange
+        userid = "test-user-id"
+        mock_get_user_by_id.side_effect = [
+            ("test-user-id", "John Doe", 30, "john@example.com", "USA"),
+            ConnectionError("Connection error"),
+        ]
+        UsersService.get_user_by_id(userid)
+
+        # Act
+        response = UsersService.get_user_by_id(userid)
+
+        # Assert
+        self.assertEqual(response.message, "user found")
+        self.assertTrue(response.stale)
+        self.assertEqual(response.data[0].fullname, "John Doe")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_get_all_user_serves_stale_data_on_connection_error(self, mock_get_all_user):
+        """
+        Test the retrieval of all users, as JSON and encoded, during a database outage.
+
+        Mocks the get_all_user method to succeed once and then raise ConnectionErrors, 
+        and asserts that the last-known-good listing is returned marked as stale.
+        """
+        # Arrange
+        mock_get_all_user.side_effect = [
+            [("test-user-id", "John Doe", 30, "john@example.com", "USA")],
+            ConnectionError("Connection error"),
+            ConnectionError("Connection error"),
+        ]
+        UsersService.get_all_user()
+
+        # Act
+        response = UsersService.get_all_user()
+        content, stale = UsersService.get_all_user_encoded(MSGPACK_MEDIA_TYPE)
+
+        # Assert
+        self.assertEqual(response.message, "users found")
+        self.assertTrue(response.stale)
+        self.assertEqual(response.data[0].fullname, "John Doe")
+        self.assertTrue(stale)
+        self.assertEqual(msgpack.unpackb(content)["rows"][0][0], "test-user-id")
+
+    @patch('src.repositories.users_rp.UsersRepository.get_all_user')
+    def test_get_all_user_fails_fast_when_circuit_open(self, mock_get_all_user):
+        """
+        Test that the repository is no longer called once the circuit has opened.
+
+        Mocks the get_all_user method to raise ConnectionErrors until the breaker opens 
+        and asserts that later requests fail without calling the repository.
+        """
+        # Arrange
+        mock_get_all_user.side_effect = ConnectionError("Connection error")
+        threshold = UsersRepository.breaker.failure_threshold
+        for _ in range(threshold):
+            UsersService.get_all_user()
+
+        # Act
+        response = UsersService.get_all_user()
+
+        # Assert
+        self.assertEqual(mock_get_all_user.call_count, threshold)
+        self.assertEqual(response.message, "failed to connect to the database")
+        self.assertFalse(response.stale)
@@ -0,0 +1,300 @@
+"""
+Tests for the hash-sharded users repository.
+
+The routing and per-shard circuit breaker tests always run. The repository and resharding tests need at least three empty
+PostgreSQL databases (they can live on one server), given as comma-separated URLs in
+`TEST_SHARD_DSNS`, and are skipped otherwise.
+"""
+import os
+import unittest
+from collections import Counter
+from unittest.mock import patch
+from src.configs import database_cursor
+from src.dtos.write.users import UsersWrite
+from src.migrations.runner import migrate
+from src.repositories.circuit_breaker import CircuitBreaker, StaleDataError
+from src.repositories.users_sharded import (
+    ShardRepository,
+    ShardedUsersRepository,
+    copy_moving_users,
+    delete_moved_users,
+    jump_hash,
+    reshard,
+    shard,
+    shard_for,
+)
+
+TEST_SHARD_DSNS = [url for url in os.getenv("TEST_SHARD_DSNS", "").split(",") if url]
+PREFIX = "shard-check-"
+
+class TestShardRouting(unittest.TestCase):
+    """
+    Test suite for the jump consistent hash routing.
+    """
+
+    def test_jump_hash_stays_in_range(self):
+        """
+        Test that every key maps to a valid bucket, and always to the same one.
+        """
+        for key in range(0, 2**64, 2**58 + 12345):
+            bucket = jump_hash(key, 7)
+            self.assertTrue(0 <= bucket < 7)
+            self.assertEqual(jump_hash(key, 7), bucket)
+
+    def test_adding_a_shard_moves_only_its_share(self):
+        """
+        Test that growing from 4 to 5 shards moves about a fifth of the users, all to the new shard.
+        """
+        # Arrange
+        ids = [f"user-{n}" for n in range(10_000)]
+        before, after = ["a", "b", "c", "d"], ["a", "b", "c", "d", "e"]
+
+        # Act
+        moved = [userid for userid in ids if shard_for(userid, before) != shard_for(userid, after)]
+
+        # Assert
+        self.assertTrue(all(shard_for(userid, after) == "e" for userid in moved))
+        self.assertAlmostEqual(len(moved) / len(ids), 1 / 5, delta=0.02)
+
+    def test_users_are_spread_evenly(self):
+        """
+        Test that users are spread evenly over the shards.
+        """
+        counts = Counter(shard_for(f"user-{n}", ["a", "b", "c"]) for n in range(9_000))
+
+        for count in counts.values():
+            self.assertAlmostEqual(count, 3_000, delta=300)
+
+class TestShardBreakers(unittest.TestCase):
+    """
+    Test suite for the circuit breakers kept per shard.
+    """
+
+    def setUp(self):
+        self.shards = ["shard-a", "shard-b"]
+        self.down = set()
+        patcher = patch.object(ShardedUsersRepository, "shards", self.shards)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ShardedUsersRepository.reset()
+        self.addCleanup(ShardedUsersRepository.reset)
+
+    def check(self, repository: ShardRepository):
+        if repository.url in self.down:
+            raise ConnectionError("Connection error")
+
+    def ids_on(self, url: str) -> list[str]:
+        return [userid for userid in (f"user-{n}" for n in range(100)) if shard_for(userid, self.shards) == url]
+
+    def test_shard_down_does_not_fail_calls_to_others(self):
+        """
+        Test that failures on one shard open its circuit only.
+        """
+        # Arrange
+        def get_user_by_id(repository, userid):
+            self.check(repository)
+            return (userid,)
+
+        self.down.add("shard-b")
+        threshold = shard("shard-b").breaker.failure_threshold
+
+        # Act
+        with patch.object(ShardRepository, "get_user_by_id", autospec=True, side_effect=get_user_by_id):
+            for userid in self.ids_on("shard-b")[:threshold]:
+                with self.assertRaises(ConnectionError):
+                    ShardedUsersRepository.get_user_by_id(userid)
+            found = ShardedUsersRepository.get_user_by_id(self.ids_on("shard-a")[0])
+
+        # Assert
+        self.assertEqual(found, (self.ids_on("shard-a")[0],))
+        self.assertEqual(shard("shard-a").breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(shard("shard-b").breaker.state, CircuitBreaker.OPEN)
+
+    def test_listing_uses_snapshot_of_shard_that_is_down(self):
+        """
+        Test that a listing merges the snapshot of a shard that is down and is marked stale.
+        """
+        # Arrange
+        def get_all_user(repository):
+            self.check(repository)
+            return [(userid,) for userid in sorted(self.ids_on(repository.url))]
+
+        with patch.object(ShardRepository, "get_all_user", autospec=True, side_effect=get_all_user):
+            fresh = ShardedUsersRepository.get_all_user()
+            self.down.add("shard-b")
+
+            # Act
+            with self.assertRaises(StaleDataError) as error:
+                ShardedUsersRepository.get_all_user()
+
+        # Assert
+        self.assertEqual(error.exception.data, fresh)
+        self.assertEqual(len(fresh), 100)
+
+@unittest.skipUnless(len(TEST_SHARD_DSNS) >= 3, "requires TEST_SHARD_DSNS with at least three databases")
+class TestShardedUsersRepository(unittest.TestCase):
+    """
+    Test suite for the sharded repository against real databases.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        for url in TEST_SHARD_DSNS:
+            migrate(url)
+        cls.original_shards = ShardedUsersRepository.shards
+
+    @classmethod
+    def tearDownClass(cls):
+        ShardedUsersRepository.shards = cls.original_shards
+
+    def setUp(self):
+        self.clear()
+        self.addCleanup(self.clear)
+        ShardedUsersRepository.shards = TEST_SHARD_DSNS[:2]
+
+    def clear(self):
+        for url in TEST_SHARD_DSNS:
+            with database_cursor(url) as cursor:
+                cursor.execute("DELETE FROM users WHERE id LIKE %s", (PREFIX + "%",))
+                cursor.execute("DELETE FROM users_reshard_copies WHERE id LIKE %s", (PREFIX + "%",))
+
+    def add_users(self, count: int) -> list[str]:
+        ids = [f"{PREFIX}{n:04d}" for n in range(count)]
+        for userid in ids:
+            ShardedUsersRepository.add_user(
+                UsersWrite(fullname=f"User {userid}", age=30, email=f"{userid}@example.com", location="Accra"),
+                userid,
+            )
+        return ids
+
+    def ids_on(self, url: str) -> set[str]:
+        with database_cursor(url) as cursor:
+            cursor.execute("SELECT id FROM users WHERE id LIKE %s", (PREFIX + "%",))
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_users_are_stored_on_their_shard(self):
+        """
+        Test that each user is stored only on the shard its ID hashes to, and read back from it.
+        """
+        # Act
+        ids = self.add_users(40)
+
+        # Assert
+        for url in TEST_SHARD_DSNS[:2]:
+            self.assertEqual(self.ids_on(url), {userid for userid in ids if shard_for(userid, TEST_SHARD_DSNS[:2]) == url})
+        self.assertEqual(ShardedUsersRepository.get_user_by_id(ids[7])[0], ids[7])
+        self.assertEqual(ShardedUsersRepository.get_user_by_email(f"{ids[9]}@example.com")[0], ids[9])
+
+    def test_listing_merges_shards_in_id_order(self):
+        """
+        Test that the listing returns the users of all shards ordered by ID.
+        """
+        ids = self.add_users(40)
+
+        listed = [row[0] for row in ShardedUsersRepository.get_all_user() if row[0].startswith(PREFIX)]
+
+        self.assertEqual(listed, sorted(ids))
+        self.assertTrue(all(self.ids_on(url) for url in TEST_SHARD_DSNS[:2]))
+
+    def test_search_merges_shards_by_similarity(self):
+        """
+        Test that the best match is found whichever shard it is on, and the limit holds.
+        """
+        ids = self.add_users(20)
+        ShardedUsersRepository.patch_user(ids[13], {"fullname": "Kwame Mensah"})
+
+        rows = ShardedUsersRepository.search_users("kwame mensa", 5)
+
+        self.assertEqual(rows[0][0], ids[13])
+        self.assertLessEqual(len(rows), 5)
+
+    def test_email_is_unique_across_shards(self):
+        """
+        Test that an email taken on one shard can't be used for a user on another.
+        """
+        ids = self.add_users(20)
+        other = next(userid for userid in ids
+                     if shard_for(userid, TEST_SHARD_DSNS[:2]) != shard_for(ids[0], TEST_SHARD_DSNS[:2]))
+
+        with self.assertRaises(ValueError):
+            ShardedUsersRepository.patch_user(other, {"email": f"{ids[0]}@example.com"})
+        with self.assertRaises(ValueError):
+            ShardedUsersRepository.add_user(
+                UsersWrite(fullname="Copy", age=30, email=f"{ids[0]}@example.com", location="Accra"),
+                PREFIX + "new",
+            )
+
+    def test_resharding_moves_users_to_their_new_shard(self):
+        """
+        Test the copy, catch-up and cleanup steps of growing from two shards to three.
+        """
+        # Arrange
+        source, target = TEST_SHARD_DSNS[:2], TEST_SHARD_DSNS[:3]
+        ids = self.add_users(60)
+        moving = [userid for userid in ids if shard_for(userid, source) != shard_for(userid, target)]
+
+        # Act
+        reshard(source, target).join()
+        ShardedUsersRepository.delete_user(moving[0])
+        ShardedUsersRepository.patch_user(moving[1], {"age": 99})
+        counts = copy_moving_users(source, target)
+        ShardedUsersRepository.shards = target
+        deleted = delete_moved_users(source, target)
+
+        # Assert
+        self.assertTrue(moving)
+        self.assertEqual(counts, {"copied": len(moving) - 1, "removed": 1})
+        self.assertEqual(deleted, len(moving) - 1)
+        for url in target:
+            self.assertEqual(self.ids_on(url), {userid for userid in ids if userid != moving[0]
+                                                and shard_for(userid, target) == url})
+        self.assertEqual(ShardedUsersRepository.get_user_by_id(moving[1])[2], 99)
+        self.assertIsNone(ShardedUsersRepository.get_user_by_id(moving[0]))
+
+    def test_repeated_copy_keeps_users_created_after_cutover(self):
+        """
+        Test that copying again after the switch never removes users created on the new shards.
+        """
+        # Arrange
+        source, target = TEST_SHARD_DSNS[:2], TEST_SHARD_DSNS[:3]
+        self.add_users(30)
+        copy_moving_users(source, target)
+        ShardedUsersRepository.shards = target
+        created = next(f"{PREFIX}new-{n}" for n in range(1000)
+                       if shard_for(f"{PREFIX}new-{n}", target) != shard_for(f"{PREFIX}new-{n}", source))
+        ShardedUsersRepository.add_user(
+            UsersWrite(fullname="New User", age=30, email=f"{created}@example.com", location="Accra"), created
+        )
+
+        # Act
+        counts = copy_moving_users(source, target)
+
+        # Assert
+        self.assertEqual(counts["removed"], 0)
+        self.assertEqual(ShardedUsersRepository.get_user_by_id(created)[0], created)
+
+    def test_reads_skip_copies_left_before_cleanup(self):
+        """
+        Test that users on their old and new shard are read once between cutover and cleanup.
+        """
+        # Arrange
+        source, target = TEST_SHARD_DSNS[:2], TEST_SHARD_DSNS[:3]
+        ids = self.add_users(60)
+        moving = next(userid for userid in ids if shard_for(userid, source) != shard_for(userid, target))
+        ShardedUsersRepository.patch_user(moving, {"fullname": "Kwame Mensah"})
+        copy_moving_users(source, target)
+
+        # Act
+        ShardedUsersRepository.shards = target
+        listed = [row[0] for row in ShardedUsersRepository.get_all_user() if row[0].startswith(PREFIX)]
+        found = [row[0] for row in ShardedUsersRepository.search_users("kwame mensa", 5)]
+        emails = [email for email in ShardedUsersRepository.get_all_emails() if email.startswith(PREFIX)]
+
+        # Assert
+        self.assertEqual(listed, sorted(ids))
+        self.assertEqual(found.count(moving), 1)
+        self.assertEqual(sorted(emails), sorted(f"{userid}@example.com" for userid in ids))
+        self.assertEqual(ShardedUsersRepository.get_user_by_email(f"{moving}@example.com")[0], moving)
+
+if __name__ == '__main__':
+    unittest.main()